@@ -2,19 +2,20 @@ import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-from typing import Optional, List
+from typing import Callable, Dict, List, Optional, Sequence
 
 from app.core import (
-    PmdlHeader, parse_header,
-    PartIndexEntry, parse_parts_index,
+    PmdlDocument,
+    SaveResult,
+    PartsEvent, PARTS_INSERTED, PARTS_REMOVED,
     FLAG_MAP_LABEL_TO_VALUE,
-    export_part, delete_part, import_part,
-    add_part_from_secondary, sync_parts_from_ui
+    export_part, delete_part, delete_parts, import_part,
+    add_part_from_secondary, add_parts_from_secondary, apply_part_edits
 )
 from app.ui import build_main_layout
 from app.ui.menubar import MenuBar
 from app.ui.about_window import AboutWindow
-from app.utils import center_window
+from app.utils import center_window, Job, JobExecutor
 from app.logic_sub_parts_pmdl.ui_pmdl_sub_parts import UiSubparts
 
 
@@ -42,28 +43,25 @@ class PmdlPartsApp(ctk.CTk):
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Estado del PMDL Principal
-        self._blob: Optional[bytearray] = None
-        self._hdr: Optional[PmdlHeader] = None
-        self._parts: List[PartIndexEntry] = []
-        self._path: Optional[str] = None
+        self._doc: Optional[PmdlDocument] = None
         
         # Estado del PMDL secundario
-        self._blob2: Optional[bytearray] = None
-        self._hdr2: Optional[PmdlHeader] = None
-        self._parts2: List[PartIndexEntry] = []
-        self._path2: Optional[str] = None
+        self._doc2: Optional[PmdlDocument] = None
+        
+        # Operaciones largas (cargar, guardar, transferir) en segundo plano
+        self._jobs = JobExecutor(self)
         
         # Construir menu bar
         self._build_menubar()
         
         # Construir UI
         callbacks = {
-            'on_part_depth_changed': self.on_part_depth_changed,
-            'on_part_opacity_changed': self.on_part_opacity_changed,
-            'on_part_flag_changed': self.on_part_flag_changed,
+            'on_parts_edited': self.on_parts_edited,
             'on_export_part': self.on_export_part,
             'on_delete_part': self.on_delete_part,
+            'on_delete_parts': self.on_delete_parts,
             'on_add_part_from_secondary': self.on_add_part_from_secondary,
+            'on_add_parts_from_secondary': self.on_add_parts_from_secondary,
         }
         
         widgets = build_main_layout(self, callbacks)
@@ -96,6 +94,13 @@ class PmdlPartsApp(ctk.CTk):
         menu_archivo.add_command("Guardar", self.on_save, "Ctrl+S")
         menu_archivo.add_command("Guardar Como", self.on_save_as, "Ctrl+Shift+S")
         
+        # Menú Editar
+        menu_editar = self.menubar.add_menu("Editar")
+        menu_editar.add_command("Deshacer", self.on_undo, "Ctrl+Z")
+        menu_editar.add_command("Rehacer", self.on_redo, "Ctrl+Y")
+        menu_editar.add_separator()
+        menu_editar.add_command("Cancelar operación", self.on_cancel_job, "Esc")
+        
         # Menú Tools
         menu_tools = self.menubar.add_menu("Tools")
         menu_tools.add_command("SubParts Editor", self.on_open_subparts_editor, "Ctrl+T")
@@ -142,6 +147,15 @@ class PmdlPartsApp(ctk.CTk):
         self.bind("<Control-Shift-S>", lambda e: self.on_save_as())
         self.bind("<Control-Shift-s>", lambda e: self.on_save_as())
         
+        # Editar
+        self.bind("<Control-z>", lambda e: self.on_undo())
+        self.bind("<Control-Z>", lambda e: self.on_undo())
+        
+        self.bind("<Control-y>", lambda e: self.on_redo())
+        self.bind("<Control-Y>", lambda e: self.on_redo())
+        
+        self.bind("<Escape>", lambda e: self.on_cancel_job())
+        
         # Tools
         self.bind("<Control-t>", lambda e: self.on_open_subparts_editor())
         self.bind("<Control-T>", lambda e: self.on_open_subparts_editor())
@@ -154,11 +168,13 @@ class PmdlPartsApp(ctk.CTk):
         self.bind("<Control-Shift-p>", lambda e: self.on_open_patch_secondary())
         
         # Importar Parte
-        self.bind("<Control-i>", lambda e: self.on_import_part() if self._blob else None)
-        self.bind("<Control-I>", lambda e: self.on_import_part() if self._blob else None)
+        self.bind("<Control-i>", lambda e: self.on_import_part() if self._doc else None)
+        self.bind("<Control-I>", lambda e: self.on_import_part() if self._doc else None)
     
     def on_close(self):
         """Confirmación antes de cerrar la aplicación."""
+        if not self._ensure_idle():
+            return
         if messagebox.askyesno("Salir", "¿Estas seguro de que deseas cerrar la aplicacion?"):
             self.destroy()
     
@@ -168,7 +184,9 @@ class PmdlPartsApp(ctk.CTk):
     
     def on_open_subparts_editor(self):
         """Abre el editor de SubParts."""
-        if not self._path and not self._path2:
+        if not self._ensure_idle():
+            return
+        if self._doc is None and self._doc2 is None:
             messagebox.showinfo("Informacion", "Abre al menos un archivo para editar")
             return
 
@@ -209,20 +227,32 @@ class PmdlPartsApp(ctk.CTk):
         self._load_and_render(path)
     
     def _load_and_render(self, path: str):
-        """Carga un archivo PMDL y actualiza la UI."""
-        try:
-            with open(path, "rb") as f:
-                blob = bytearray(f.read())
-            hdr = parse_header(blob)
-            parts = parse_parts_index(blob, hdr)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo leer el .pmdl:\n{e}")
+        """Carga un archivo PMDL en segundo plano y actualiza la UI."""
+        if not self._ensure_idle():
             return
-        
-        self._blob = blob
-        self._hdr = hdr
-        self._parts = parts
-        self._path = path
+        self._start_job(
+            "Cargando PMDL",
+            lambda job: self._open_document(job, path),
+            self._on_main_loaded,
+            "No se pudo leer el .pmdl"
+        )
+    
+    @staticmethod
+    def _open_document(job: Job, path: str) -> PmdlDocument:
+        """Abre `path` en el hilo de trabajo; si se canceló mientras tanto, lo cierra."""
+        doc = PmdlDocument(path)
+        if job.cancelled:
+            doc.close()
+            job.check()
+        return doc
+    
+    def _on_main_loaded(self, doc: PmdlDocument):
+        """Muestra el PMDL principal recién cargado."""
+        path = doc.path
+        if self._doc is not None:
+            self._doc.close()
+        self._doc = doc
+        doc.add_listener(self._jobs.in_ui(self._on_main_parts_changed))
         
         # Mostrar ruta
         self.path_entry.configure(state="normal")
@@ -232,50 +262,163 @@ class PmdlPartsApp(ctk.CTk):
         self.tooltip_path_entry.change_text(path)
         
         # Actualizar tabla
-        self.parts_table.show_top_controls(self._hdr.part_count, self.on_import_part)
-        self.parts_table.populate(self._parts)
+        self.parts_table.show_top_controls(self._doc.hdr.part_count, self.on_import_part)
+        self.parts_table.populate(self._doc.parts)
         self.status_var.set(f"Archivo cargado: {os.path.basename(path)}")
     
     # ------------ Ediciones en memoria ------------
     
-    def on_part_depth_changed(self, part_index: int, new_low_byte: int):
-        """Callback: cambio de profundidad (capa)."""
-        if self._parts and 0 <= part_index < len(self._parts):
-            current = self._parts[part_index].part_id
-            self._parts[part_index].part_id = (current & 0xFF00) | (new_low_byte & 0x00FF)
-            self.status_var.set(f"Parte {part_index:02d}: Profundidad = {new_low_byte:02X}")
-    
-    def on_part_opacity_changed(self, part_index: int, new_percent: int):
-        """Callback: cambio de opacidad."""
-        if self._parts and 0 <= part_index < len(self._parts):
-            from app.core import opacity_u16_from_percent
-            self._parts[part_index].opacity = opacity_u16_from_percent(new_percent)
-            self.status_var.set(f"Parte {part_index:02d}: Opacidad = {new_percent}%")
-    
-    def on_part_flag_changed(self, part_index: int, new_label: str):
-        """Callback: cambio de función."""
-        if self._parts and 0 <= part_index < len(self._parts):
-            value = FLAG_MAP_LABEL_TO_VALUE.get(new_label, 0x00)
-            self._parts[part_index].special_flag = value
-            self.status_var.set(f"Parte {part_index:02d}: Función = '{new_label}' (0x{value:02X})")
+    def on_parts_edited(self, edits: Dict[int, dict]) -> bool:
+        """
+        Callback: ediciones de capa, opacidad y función acumuladas por la tabla.
+        
+        Llega como mucho una vez por cuadro; el modelo se actualiza en una
+        sola pasada y la barra de estado una sola vez. Devuelve False si no se
+        pudieron aplicar todavía: la tabla las conserva pendientes y las vuelve
+        a entregar cuando termina la operación en curso.
+        """
+        if self._report_busy():
+            return False
+        if self._doc is None:
+            return True
+        if not self._doc.lock.acquire(blocking=False):
+            return False
+        try:
+            changed = apply_part_edits(self._doc, edits)
+        finally:
+            self._doc.lock.release()
+        if not changed:
+            return True
+        
+        if len(edits) > 1:
+            self.status_var.set(f"{len(changed)} parte(s) editadas")
+            return True
+        
+        (part_index, fields), = edits.items()
+        messages = []
+        if 'depth' in fields:
+            messages.append(f"Profundidad = {fields['depth']:02X}")
+        if 'opacity_pct' in fields:
+            messages.append(f"Opacidad = {fields['opacity_pct']}%")
+        if 'flag_label' in fields:
+            value = FLAG_MAP_LABEL_TO_VALUE.get(fields['flag_label'], 0x00)
+            messages.append(f"Función = '{fields['flag_label']}' (0x{value:02X})")
+        self.status_var.set(f"Parte {part_index:02d}: " + " · ".join(messages))
+        return True
+    
+    # ------------ Deshacer / Rehacer ------------
+    
+    def on_undo(self):
+        """Deshace la última operación sobre el PMDL principal."""
+        if self._doc is None or not self._ensure_idle():
+            return
+        self.parts_table.flush_edits()
+        label = self._doc.undo()
+        if label is None:
+            self.status_var.set("Nada que deshacer.")
+            return
+        self.status_var.set(f"Deshecho: {label}" if label else "Deshecho.")
+    
+    def on_redo(self):
+        """Rehace la última operación deshecha sobre el PMDL principal."""
+        if self._doc is None or not self._ensure_idle():
+            return
+        self.parts_table.flush_edits()
+        label = self._doc.redo()
+        if label is None:
+            self.status_var.set("Nada que rehacer.")
+            return
+        self.status_var.set(f"Rehecho: {label}" if label else "Rehecho.")
+    
+    # ------------ Operaciones en segundo plano ------------
+    
+    def _start_job(self, label: str, work: Callable, on_done: Callable, error_msg: str,
+                   docs: Sequence[PmdlDocument] = ()):
+        """
+        Corre `work(job)` en el hilo de trabajo con `docs` bloqueados.
+        
+        `on_done` recibe el resultado en el hilo de Tk; los errores se muestran
+        con `error_msg` como encabezado. Mientras corre, las tablas quedan
+        congeladas; al terminar (bien, con error o cancelada) se descongelan y
+        se aplican las ediciones hechas entretanto.
+        """
+        # Las ediciones pendientes entran al modelo antes de bloquearlo
+        self.parts_table.flush_edits()
+        self.status_var.set(f"{label}... (Esc para cancelar)")
+        self._jobs.submit(
+            label,
+            work,
+            on_done=self._after_job(on_done),
+            on_error=self._after_job(lambda e: self._on_job_error(error_msg, e)),
+            on_cancel=self._after_job(lambda: self.status_var.set(f"{label}: cancelado.")),
+            on_progress=self._on_job_progress,
+            locks=[d.lock for d in docs]
+        )
+        self.parts_table.freeze()
+        self.parts2_table.freeze()
+    
+    def _after_job(self, callback: Callable) -> Callable:
+        """Envuelve `callback` para descongelar las tablas antes de llamarlo."""
+        def wrapper(*args):
+            self.parts_table.thaw()
+            self.parts2_table.thaw()
+            self.parts_table.flush_edits()
+            callback(*args)
+        return wrapper
+    
+    def _on_job_progress(self, job: Job, done: int, total: int):
+        """Muestra el avance de la operación en la barra de estado."""
+        percent = done * 100 // total if total else 0
+        self.status_var.set(f"{job.label}... {percent}% (Esc para cancelar)")
+    
+    def _on_job_error(self, error_msg: str, error: Exception):
+        self.status_var.set(f"{error_msg}.")
+        messagebox.showerror("Error", f"{error_msg}:\n{error}")
+    
+    def _ensure_idle(self) -> bool:
+        """Devuelve True si no hay operación en curso; si la hay, avisa."""
+        if not self._jobs.busy:
+            return True
+        messagebox.showinfo(
+            "Operación en curso",
+            f"Espera a que termine '{self._jobs.current.label}' o cancélala con Esc."
+        )
+        return False
+    
+    def _report_busy(self) -> bool:
+        """Como `_ensure_idle`, pero avisa solo en la barra de estado."""
+        if not self._jobs.busy:
+            return False
+        self.status_var.set(f"{self._jobs.current.label}... la edición se aplicará al terminar.")
+        return True
+    
+    def on_cancel_job(self):
+        """Pide cancelar la operación en segundo plano."""
+        if self._jobs.cancel():
+            self.status_var.set(f"{self._jobs.current.label}: cancelando...")
+    
+    def _on_main_parts_changed(self, event: PartsEvent):
+        """Aplica a la tabla principal solo las filas que cambiaron en el documento."""
+        self.parts_table.apply_change(event)
+        if event.kind in (PARTS_INSERTED, PARTS_REMOVED):
+            self.parts_table.update_part_count(self._doc.hdr.part_count)
     
     # ------------ Exportar parte ------------
     
     def on_export_part(self, part_index: int):
         """Exporta una parte como archivo .tttpart."""
-        if self._blob is None or self._hdr is None or not self._parts or not self._path:
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
             messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
             return
         
-        if not (0 <= part_index < len(self._parts)):
+        if not (0 <= part_index < len(self._doc.parts)):
             messagebox.showerror("Error", "Índice de parte inválido.")
             return
         
         try:
-            p = self._parts[part_index]
-            chunk = export_part(self._blob, p)
-            
-            base = os.path.splitext(os.path.basename(self._path))[0]
+            base = os.path.splitext(os.path.basename(self._doc.path))[0]
             default_name = f"{base}_parte_{part_index:02d}.tttpart"
             
             out_path = filedialog.asksaveasfilename(
@@ -288,7 +431,8 @@ class PmdlPartsApp(ctk.CTk):
             if not out_path:
                 return
             
-            with open(out_path, "wb") as f:
+            # La vista se libera al salir del bloque, aunque la escritura falle
+            with export_part(self._doc, part_index) as chunk, open(out_path, "wb") as f:
                 f.write(chunk)
             
             messagebox.showinfo("Exportado", f"Parte {part_index:02d} exportada en:\n{out_path}")
@@ -299,28 +443,61 @@ class PmdlPartsApp(ctk.CTk):
     
     def on_delete_part(self, part_index: int):
         """Elimina una parte del PMDL."""
-        if self._blob is None or self._hdr is None or not self._parts or not self._path:
+        if self._doc is None or not self._doc.parts:
             messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
             return
         
-        try:
-            delete_part(self._blob, self._hdr, self._parts, part_index)
-            
-            # Refrescar UI
-            self.parts_table.populate(self._parts)
-            self.parts_table.update_part_count(self._hdr.part_count)
-            
+        if not self._ensure_idle():
+            return
+        
+        def on_done(_):
             self.status_var.set("Parte borrada correctamente · Los ijue30s")
             messagebox.showinfo("Borrado", "Parte eliminada correctamente.")
         
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo borrar la parte:\n{e}")
+        doc = self._doc
+        self._start_job(
+            "Borrando parte",
+            lambda job: delete_part(doc, part_index, job.report),
+            on_done,
+            "No se pudo borrar la parte",
+            docs=(doc,)
+        )
+    
+    def on_delete_parts(self, part_indices: List[int]):
+        """Elimina varias partes del PMDL en una sola pasada."""
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
+            messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
+            return
+        
+        if not part_indices:
+            messagebox.showinfo("Info", "Selecciona al menos una parte.")
+            return
+        
+        confirm = messagebox.askyesno(
+            "Confirmar borrado",
+            f"¿Estas seguro de que deseas borrar {len(part_indices)} parte(s)?"
+        )
+        if not confirm:
+            return
+        
+        doc = self._doc
+        self._start_job(
+            "Borrando partes",
+            lambda job: delete_parts(doc, part_indices, job.report),
+            lambda _: self.status_var.set(f"{len(part_indices)} parte(s) borradas · Los ijue30s"),
+            "No se pudieron borrar las partes",
+            docs=(doc,)
+        )
     
     # ------------ Guardar ------------
     
     def on_save(self):
         """Guarda los cambios en el archivo original."""
-        if self._blob is None or self._hdr is None or not self._parts or not self._path:
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
             messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
             return
         
@@ -331,66 +508,79 @@ class PmdlPartsApp(ctk.CTk):
         if not confirm:
             return
         
-        try:
-            # Sincronizar datos de UI a memoria
-            ui_data = self.parts_table.get_ui_data()
-            sync_parts_from_ui(self._blob, self._hdr, self._parts, ui_data)
-            
-            # Guardar archivo
-            with open(self._path, "wb") as f:
-                f.write(self._blob)
-            
-            self.status_var.set("Cambios guardados.")
+        # Las ediciones de la tabla ya están en el modelo (`_start_job` entrega
+        # las pendientes)
+        doc = self._doc
+        
+        def on_done(result: SaveResult):
+            self.status_var.set(f"Cambios guardados · {self._format_save_result(result)}")
             messagebox.showinfo("Listo", "Cambios guardados en el .pmdl.")
         
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo guardar el archivo:\n{e}")
+        # Guardar archivo
+        self._start_job(
+            "Guardando",
+            lambda job: doc.save(progress=job.report),
+            on_done,
+            "No se pudo guardar el archivo",
+            docs=(doc,)
+        )
     
     def on_save_as(self):
         """Guarda el PMDL con un nuevo nombre."""
-        if self._blob is None or self._hdr is None or not self._parts:
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
             messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
             return
         
-        try:
-            # Sincronizar datos de UI a memoria
-            ui_data = self.parts_table.get_ui_data()
-            sync_parts_from_ui(self._blob, self._hdr, self._parts, ui_data)
-            
-            # Elegir destino
-            initial = os.path.basename(self._path) if self._path else "nuevo.pmdl"
-            out_path = filedialog.asksaveasfilename(
-                title="Guardar como...",
-                defaultextension=".pmdl",
-                initialfile=initial,
-                filetypes=[("PMDL", "*.pmdl"), ("Todos los archivos", "*.*")]
-            )
-            
-            if not out_path:
-                return
-            
-            # Guardar
-            with open(out_path, "wb") as f:
-                f.write(self._blob)
-            
+        # Elegir destino
+        doc = self._doc
+        initial = os.path.basename(doc.path) if doc.path else "nuevo.pmdl"
+        out_path = filedialog.asksaveasfilename(
+            title="Guardar como...",
+            defaultextension=".pmdl",
+            initialfile=initial,
+            filetypes=[("PMDL", "*.pmdl"), ("Todos los archivos", "*.*")]
+        )
+        
+        if not out_path:
+            return
+        
+        def on_done(result: SaveResult):
             # Actualizar estado
-            self._path = out_path
             self.path_entry.configure(state="normal")
             self.path_entry.delete(0, tk.END)
             self.path_entry.insert(0, os.path.basename(out_path))
             self.path_entry.configure(state="disabled")
             
-            self.status_var.set(f"Guardado como: {os.path.basename(out_path)}")
+            self.status_var.set(
+                f"Guardado como: {os.path.basename(out_path)} · {self._format_save_result(result)}"
+            )
             messagebox.showinfo("Listo", f"Guardado como:\n{out_path}")
         
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo guardar:\n{e}")
+        # Guardar
+        self._start_job(
+            "Guardando",
+            lambda job: doc.save(out_path, progress=job.report),
+            on_done,
+            "No se pudo guardar",
+            docs=(doc,)
+        )
+    
+    @staticmethod
+    def _format_save_result(result: SaveResult) -> str:
+        """Texto de estado con los bytes escritos y la velocidad del guardado."""
+        mode = "parcial" if result.patched else "completo"
+        return (f"{result.bytes_written:,} bytes ({mode}) · "
+                f"{result.bytes_per_second / (1024 * 1024):.1f} MB/s")
     
     # ------------ Importar Parte (.tttpart) ------------
     
     def on_import_part(self):
         """Importa una parte desde archivo .tttpart."""
-        if self._blob is None or self._hdr is None or self._parts is None:
+        if not self._ensure_idle():
+            return
+        if self._doc is None:
             messagebox.showinfo("Info", "Abre primero un archivo .pmdl.")
             return
         
@@ -401,23 +591,23 @@ class PmdlPartsApp(ctk.CTk):
         if not in_path:
             return
         
-        try:
+        doc = self._doc
+        
+        def work(job: Job):
             with open(in_path, "rb") as f:
                 new_part_data = f.read()
-            
-            new_offset, new_length = import_part(self._blob, self._hdr, self._parts, new_part_data)
-            
-            # Refrescar UI
-            self.parts_table.populate(self._parts)
-            self.parts_table.update_part_count(self._hdr.part_count)
-            
+            job.check()
+            return import_part(doc, new_part_data)
+        
+        def on_done(result):
+            new_offset, new_length = result
+            self.status_var.set("Parte importada · Los ijue30s")
             messagebox.showinfo(
                 "Importada",
                 f"Parte añadida correctamente.\nOffset=0x{new_offset:X}\nLongitud=0x{new_length:X}"
             )
         
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo importar la parte:\n{e}")
+        self._start_job("Importando parte", work, on_done, "No se pudo importar la parte", docs=(doc,))
     
     # ------------ PMDL Secundario ------------
     
@@ -432,20 +622,22 @@ class PmdlPartsApp(ctk.CTk):
         self._load_and_render_secondary(path)
     
     def _load_and_render_secondary(self, path: str):
-        """Carga un PMDL secundario y actualiza la UI."""
-        try:
-            with open(path, "rb") as f:
-                blob = bytearray(f.read())
-            hdr = parse_header(blob)
-            parts = parse_parts_index(blob, hdr)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo leer el .pmdl secundario:\n{e}")
+        """Carga un PMDL secundario en segundo plano y actualiza la UI."""
+        if not self._ensure_idle():
             return
-        
-        self._blob2 = blob
-        self._hdr2 = hdr
-        self._parts2 = parts
-        self._path2 = path
+        self._start_job(
+            "Cargando PMDL secundario",
+            lambda job: self._open_document(job, path),
+            self._on_secondary_loaded,
+            "No se pudo leer el .pmdl secundario"
+        )
+    
+    def _on_secondary_loaded(self, doc: PmdlDocument):
+        """Muestra el PMDL secundario recién cargado."""
+        path = doc.path
+        if self._doc2 is not None:
+            self._doc2.close()
+        self._doc2 = doc
         
         # Mostrar ruta
         self.path2_entry.configure(state="normal")
@@ -455,52 +647,82 @@ class PmdlPartsApp(ctk.CTk):
         self.tooltip_path2_entry.change_text(path)
         
         # Poblar tabla
-        self.parts2_table.update_part_count(self._hdr2.part_count)
-        self.parts2_table.populate(self._parts2)
+        self.parts2_table.update_part_count(self._doc2.hdr.part_count)
+        self.parts2_table.populate(self._doc2.parts)
         
         self.status_var.set("PMDL secundario cargado · Los ijue30s")
     
     def on_add_part_from_secondary(self, part_index: int):
         """Agrega una parte del PMDL secundario al principal."""
-        if self._blob is None or self._hdr is None or not self._parts or not self._path:
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
             messagebox.showinfo("Info", "Abre primero un PMDL principal.")
             return
         
-        if self._blob2 is None or self._hdr2 is None or not self._parts2 or self._path2 is None:
+        if self._doc2 is None or not self._doc2.parts:
             messagebox.showinfo("Info", "Importa primero un PMDL secundario.")
             return
         
-        if not (0 <= part_index < len(self._parts2)):
+        if not (0 <= part_index < len(self._doc2.parts)):
             messagebox.showerror("Error", "Índice de parte (secundario) inválido.")
             return
         
-        try:
-            src = self._parts2[part_index]
-            new_offset, new_length = add_part_from_secondary(
-                self._blob, self._hdr, self._parts,
-                self._blob2, src
-            )
-            
-            # Refrescar UI
-            self.parts_table.populate(self._parts)
-            self.parts_table.update_part_count(self._hdr.part_count)
-            
+        def on_done(result):
+            new_offset, new_length = result
             self.status_var.set("Parte agregada desde secundario · Los ijue30s")
             messagebox.showinfo(
                 "Listo",
                 f"Parte agregada desde secundario.\nOffset=0x{new_offset:X}\nLongitud=0x{new_length:X}"
             )
         
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo agregar la parte desde el secundario:\n{e}")
+        doc, doc2 = self._doc, self._doc2
+        self._start_job(
+            "Agregando parte",
+            lambda job: add_part_from_secondary(doc, doc2, part_index, job.report),
+            on_done,
+            "No se pudo agregar la parte desde el secundario",
+            docs=(doc, doc2)
+        )
+    
+    def on_add_parts_from_secondary(self, part_indices: List[int]):
+        """Agrega varias partes del PMDL secundario al principal en una sola pasada."""
+        if not self._ensure_idle():
+            return
+        if self._doc is None or not self._doc.parts:
+            messagebox.showinfo("Info", "Abre primero un PMDL principal.")
+            return
+        
+        if self._doc2 is None or not self._doc2.parts:
+            messagebox.showinfo("Info", "Importa primero un PMDL secundario.")
+            return
+        
+        if not part_indices:
+            messagebox.showinfo("Info", "Selecciona al menos una parte del secundario.")
+            return
+        
+        def on_done(added):
+            self.status_var.set(f"{len(added)} parte(s) agregadas desde secundario · Los ijue30s")
+            messagebox.showinfo("Listo", f"{len(added)} parte(s) agregadas desde secundario.")
+        
+        doc, doc2 = self._doc, self._doc2
+        self._start_job(
+            "Agregando partes",
+            lambda job: add_parts_from_secondary(doc, doc2, part_indices, job.report),
+            on_done,
+            "No se pudieron agregar las partes desde el secundario",
+            docs=(doc, doc2)
+        )
     
     def on_close_pmdl_main(self):
         """Cierra el PMDL principal y limpia la interfaz."""
+        if not self._ensure_idle():
+            return
+        
         # Limpiar estado
-        self._blob = None
-        self._hdr = None
-        self._parts = []
-        self._path = None
+        if self._doc is not None:
+            self._doc.close()
+        self._doc = None
         
         # Limpiar entry de ruta
         self.path_entry.configure(state="normal")
@@ -516,11 +738,13 @@ class PmdlPartsApp(ctk.CTk):
     
     def on_close_pmdl_secondary(self):
         """Cierra el PMDL secundario y limpia la interfaz."""
+        if not self._ensure_idle():
+            return
+        
         # Limpiar estado
-        self._blob2 = None
-        self._hdr2 = None
-        self._parts2 = []
-        self._path2 = None
+        if self._doc2 is not None:
+            self._doc2.close()
+        self._doc2 = None
         
         # Limpiar entry de ruta
         self.path2_entry.configure(state="normal")
@@ -1,28 +1,44 @@
 from .header import PmdlHeader, parse_header
-from .parts_index import PartIndexEntry, parse_parts_index
+from .parts_index import PartIndexEntry, PartTable, parse_parts_index
 from .converters import percent_from_opacity_u16, opacity_u16_from_percent
 from .flags import FLAG_MAP_VALUE_TO_LABEL, FLAG_MAP_LABEL_TO_VALUE, FLAG_OPTIONS_LABELS
+from .journal import Journal
+from .events import PartsEvent, PARTS_INSERTED, PARTS_REMOVED, PARTS_UPDATED, PARTS_RENUMBERED
+from .document import PmdlDocument, SaveResult
 from .operations import (
     export_part,
     delete_part,
+    delete_parts,
     import_part,
     add_part_from_secondary,
-    sync_parts_from_ui
+    add_parts_from_secondary,
+    apply_part_edits
 )
 
 __all__ = [
     'PmdlHeader',
     'parse_header',
     'PartIndexEntry',
+    'PartTable',
     'parse_parts_index',
     'percent_from_opacity_u16',
     'opacity_u16_from_percent',
     'FLAG_MAP_VALUE_TO_LABEL',
     'FLAG_MAP_LABEL_TO_VALUE',
     'FLAG_OPTIONS_LABELS',
+    'Journal',
+    'PartsEvent',
+    'PARTS_INSERTED',
+    'PARTS_REMOVED',
+    'PARTS_UPDATED',
+    'PARTS_RENUMBERED',
+    'PmdlDocument',
+    'SaveResult',
     'export_part',
     'delete_part',
+    'delete_parts',
     'import_part',
     'add_part_from_secondary',
-    'sync_parts_from_ui',
+    'add_parts_from_secondary',
+    'apply_part_edits',
 ]
\ No newline at end of file
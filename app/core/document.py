@@ -0,0 +1,648 @@
+"""
+Documento PMDL respaldado por un mapeo del archivo en memoria (mmap).
+"""
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .header import PmdlHeader, parse_header
+from .parts_index import PartIndexEntry, PartTable, PART_INDEX_STRIDE, parse_parts_index
+from .piece_table import PieceTable
+from .offset_index import OffsetIndex
+from .events import PartsEvent, PARTS_INSERTED, PARTS_REMOVED, PARTS_UPDATED, PARTS_RENUMBERED
+from .journal import (
+    Change, Journal, SetPartChange, SetFieldsChange, InsertPartsChange, RemovePartsChange,
+    DropResidueChange
+)
+
+
+# Tamaño del buffer de escritura al guardar
+SAVE_CHUNK_SIZE = 1 << 20
+
+
+def _read_umask() -> int:
+    """Máscara de permisos del proceso (os.umask solo permite leerla cambiándola)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Se lee una sola vez al importar, antes de que existan hilos de trabajo
+_UMASK = _read_umask()
+
+
+class PmdlDocument:
+    """
+    PMDL abierto en modo documento.
+
+    Al abrir solo se interpretan la cabecera y el índice de partes; el resto del
+    archivo queda mapeado y el sistema lo pagina bajo demanda.
+
+    El documento es un modelo lógico: la región previa al índice (cabecera,
+    huesos), la lista ordenada de partes (metadatos en `parts`, bytes en
+    `part_data(i)`) y el residuo final. Las operaciones solo editan ese modelo;
+    el layout físico (contador, índice, offsets y truncado de residuos) se
+    calcula en una sola pasada con `serialize()`. Hasta que un guardado termina
+    bien, la columna `part_offset` de `parts` conserva los offsets del último
+    layout.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._source = None
+
+        self._prefix = memoryview(b"")
+        self._payloads: List = []
+        self._gaps: List = []
+        self._tail = memoryview(b"")
+
+        # Tamaño (hueco + bytes) de cada parte, con sumas prefijas en O(log n)
+        self._spans = OffsetIndex()
+
+        # Versión de los bytes de cada parte: cambia con cada modificación y
+        # nunca se repite, de modo que sirve como clave de caché
+        self._versions: List[int] = []
+        self._version_counter = itertools.count(1)
+
+        # Cambios desde el último guardado
+        self._layout_changed = False
+        self._dirty_payloads: Set[int] = set()
+
+        # Historial de deshacer/rehacer
+        self.journal = Journal()
+
+        # Vistas suscritas a los cambios de las partes
+        self._listeners: List[Callable[[PartsEvent], None]] = []
+
+        # Tomado mientras una operación en segundo plano modifica o guarda el
+        # documento
+        self.lock = threading.RLock()
+
+        self._map(path)
+        try:
+            self.hdr: PmdlHeader = parse_header(self._source)
+            self.parts: PartTable = parse_parts_index(self._source, self.hdr)
+            self._bind(self._source)
+        except Exception:
+            self.close()
+            raise
+        self._versions = self._new_versions(len(self.parts))
+
+    # ----- Mapeo -----
+
+    def _map(self, path: str):
+        """Mapea `path` en modo solo lectura."""
+        f = open(path, "rb")
+        try:
+            if os.fstat(f.fileno()).st_size == 0:
+                source = b""
+            else:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        self._file = f
+        self._source = source
+
+    def _unmap(self):
+        """
+        Libera el mapeo y el descriptor del archivo.
+
+        No falla aunque quede alguna vista externa sobre el mapeo: en ese caso
+        `mmap.close()` no puede cerrarlo, el documento lo suelta igual y el
+        mapeo se libera al morir la última vista.
+        """
+        source, self._source = self._source, None
+        file, self._file = self._file, None
+        try:
+            if isinstance(source, mmap.mmap):
+                try:
+                    source.close()
+                except BufferError:
+                    pass
+        finally:
+            if file is not None:
+                file.close()
+
+    def _bind(self, source, offsets: Optional[np.ndarray] = None):
+        """
+        Enlaza el modelo lógico a `source` según `offsets` (por defecto, los
+        de `parts`).
+
+        Cada parte queda como una vista de su rango; los bytes entre partes se
+        conservan como hueco previo a la parte siguiente.
+        """
+        if offsets is None:
+            offsets = self.parts.offsets
+        view = memoryview(source).toreadonly()
+        base = self.hdr.parts_index_offset
+        prev_end = base + len(self.parts) * PART_INDEX_STRIDE
+
+        payloads, gaps = [], []
+        for off, ln in zip(offsets.tolist(), self.parts.lengths.tolist()):
+            gaps.append(view[prev_end:off] if off > prev_end else view[0:0])
+            payloads.append(view[off:off + ln])
+            prev_end = off + ln
+
+        self._prefix = view[:base]
+        self._payloads = payloads
+        self._gaps = gaps
+        self._tail = view[prev_end:]
+        self._reindex_spans()
+
+    def _release(self):
+        """Suelta todas las vistas sobre el origen actual."""
+        self._prefix = memoryview(b"")
+        self._payloads = []
+        self._gaps = []
+        self._tail = memoryview(b"")
+        self._spans = OffsetIndex()
+
+    def _reindex_spans(self):
+        """Reconstruye el índice de tamaños tras un cambio estructural."""
+        self._spans = OffsetIndex(len(g) + len(d) for g, d in zip(self._gaps, self._payloads))
+
+    # ----- Modelo lógico -----
+
+    def part_data(self, index: int):
+        """
+        Bytes de una parte (vista de solo lectura o bytes propios).
+
+        Pensado para el núcleo; fuera de él, `export_part` acota la vista a un
+        bloque `with`.
+        """
+        return self._payloads[index]
+
+    def part_version(self, index: int) -> int:
+        """Versión actual de los bytes de una parte."""
+        return self._versions[index]
+
+    def _new_versions(self, count: int) -> List[int]:
+        return [next(self._version_counter) for _ in range(count)]
+
+    def set_part_data(self, index: int, data):
+        """Reemplaza los bytes de una parte."""
+        if self._recording():
+            self._record(SetPartChange(index, self._payloads[index], data))
+        if len(data) == len(self._payloads[index]):
+            self._dirty_payloads.add(index)
+        else:
+            self._layout_changed = True
+        self._payloads[index] = bytes(data)
+        self.parts[index].part_length = len(data)
+        self._spans.set(index, len(self._gaps[index]) + len(data))
+        self._versions[index] = next(self._version_counter)
+        self._emit(PartsEvent(PARTS_UPDATED, (index,)))
+
+    def set_part_fields(self, indices: Sequence[int], values: Dict[str, np.ndarray],
+                        notify: bool = True):
+        """
+        Cambia columnas del índice (`part_id`, `opacity`, `special_flag`) de
+        las partes en `indices`; `values` trae una columna por nombre.
+
+        Las entradas quedan marcadas como modificadas. Con `notify` se avisa a
+        las vistas; sin él, quien edita ya muestra el valor nuevo.
+        """
+        indices = list(indices)
+        if not indices:
+            return
+        records = self.parts.records
+        if self._recording():
+            self._record(SetFieldsChange(
+                indices,
+                {name: records[name][indices].copy() for name in values},
+                {name: np.array(column, dtype=records.dtype[name]) for name, column in values.items()},
+            ))
+        for name, column in values.items():
+            records[name][indices] = column
+        self.parts.dirty[indices] = True
+        if notify:
+            self.notify_parts_updated(indices)
+
+    def append_part(self, entry: PartIndexEntry, data):
+        """Agrega una parte al final del documento."""
+        self.append_parts([entry], [data])
+
+    def append_parts(self, entries: Sequence[PartIndexEntry], datas: Sequence):
+        """
+        Agrega varias partes al final del documento.
+
+        Los bytes de todas las partes se copian a un único bloque contiguo y
+        cada parte queda como una vista de su tramo; el índice crece una vez.
+        """
+        if not entries:
+            return
+
+        first = len(self._payloads)
+        block = memoryview(b"".join(datas))
+        pos = 0
+        for data in datas:
+            self._payloads.append(block[pos:pos + len(data)])
+            self._gaps.append(b"")
+            self._spans.append(len(data))
+            pos += len(data)
+
+        self._versions.extend(self._new_versions(len(datas)))
+        self.parts.extend(entries)
+        self.parts.records['part_length'][-len(entries):] = [len(d) for d in datas]
+        self.hdr.part_count = len(self.parts)
+        self._layout_changed = True
+
+        if self._recording():
+            self._record(InsertPartsChange(
+                range(first, len(self._payloads)),
+                self.parts.records[first:].copy(),
+                self._payloads[first:],
+                self._gaps[first:],
+            ))
+        self._emit(PartsEvent(PARTS_INSERTED, tuple(range(first, len(self._payloads)))))
+
+    def insert_parts(self, positions: Sequence[int], rows: np.ndarray, payloads: Sequence,
+                     gaps: Sequence):
+        """
+        Inserta partes para que queden en `positions` (posiciones finales,
+        ascendentes), con sus entradas del índice, bytes y huecos previos.
+        """
+        for pos, data, gap in zip(positions, payloads, gaps):
+            self._payloads.insert(pos, data)
+            self._gaps.insert(pos, gap)
+            self._versions.insert(pos, next(self._version_counter))
+        self.parts.insert(positions, rows)
+        self.hdr.part_count = len(self.parts)
+        self._reindex_spans()
+        self._dirty_payloads.clear()
+        self._layout_changed = True
+
+        if self._recording():
+            self._record(InsertPartsChange(positions, rows.copy(), list(payloads), list(gaps)))
+        self._emit_structural(PARTS_INSERTED, positions, len(self._payloads) - len(positions))
+
+    def remove_part(self, index: int):
+        """Quita una parte; su hueco previo pasa a la parte siguiente."""
+        self.remove_parts([index])
+
+    def remove_parts(self, indices: Sequence[int]):
+        """
+        Quita varias partes en una sola pasada.
+
+        El hueco previo de cada parte quitada se acumula y pasa a la siguiente
+        parte que se conserva, igual que al quitarlas una a una.
+        """
+        drop = set(indices)
+        positions = sorted(drop)
+        payloads, gaps, versions = [], [], []
+        kept_gaps = []
+        carry = b""
+        for i, (gap, data) in enumerate(zip(self._gaps, self._payloads)):
+            if i in drop:
+                carry += bytes(gap)
+                continue
+            if carry:
+                kept_gaps.append((i, bytes(gap)))
+                gap = carry + bytes(gap)
+                carry = b""
+            gaps.append(gap)
+            payloads.append(data)
+            versions.append(self._versions[i])
+
+        if self._recording():
+            self._record(RemovePartsChange(
+                positions,
+                self.parts.records[positions].copy(),
+                [bytes(self._payloads[i]) for i in positions],
+                [bytes(self._gaps[i]) for i in positions],
+                kept_gaps,
+            ))
+
+        self._payloads = payloads
+        self._gaps = gaps
+        self._versions = versions
+        self._reindex_spans()
+        self.parts.delete(positions)
+        self.hdr.part_count = len(self.parts)
+        self._dirty_payloads.clear()
+        self._layout_changed = True
+        self._emit_structural(PARTS_REMOVED, positions, len(self._payloads))
+
+    def drop_residue(self):
+        """Descarta los bytes posteriores a la última parte."""
+        if len(self._tail):
+            if self._recording():
+                self._record(DropResidueChange(bytes(self._tail)))
+            self._layout_changed = True
+        self._tail = b""
+
+    def set_residue(self, tail: bytes):
+        """Restablece los bytes posteriores a la última parte."""
+        self._tail = tail
+        self._layout_changed = True
+
+    def set_part_gap(self, index: int, gap: bytes):
+        """Restablece los bytes previos a una parte."""
+        self._gaps[index] = gap
+        self._spans.set(index, len(gap) + len(self._payloads[index]))
+        self._layout_changed = True
+
+    # ----- Eventos -----
+
+    def add_listener(self, callback: Callable[[PartsEvent], None]):
+        """Suscribe `callback` a los cambios de las partes."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[PartsEvent], None]):
+        """Cancela la suscripción de `callback`."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify_parts_updated(self, indices: Iterable[int]):
+        """Avisa que cambiaron los metadatos de las partes en `indices`."""
+        indices = tuple(sorted(indices))
+        if indices:
+            self._emit(PartsEvent(PARTS_UPDATED, indices))
+
+    def _emit(self, event: PartsEvent):
+        for callback in list(self._listeners):
+            callback(event)
+
+    def _emit_structural(self, kind: str, positions: Sequence[int], kept: int):
+        """Emite un alta o baja de filas y, si corresponde, la renumeración de las conservadas."""
+        positions = tuple(int(i) for i in positions)
+        if not positions:
+            return
+        self._emit(PartsEvent(kind, positions))
+        # Las filas conservadas desde la primera posición cambiaron de número
+        if kept > positions[0]:
+            self._emit(PartsEvent(PARTS_RENUMBERED, start=positions[0]))
+
+    # ----- Historial -----
+
+    def _recording(self) -> bool:
+        """Indica si los cambios deben registrarse (no mientras se deshace o rehace)."""
+        return not self.journal.replaying
+
+    def _record(self, change: Change):
+        self.journal.record(change)
+
+    def undo(self) -> Optional[str]:
+        """Deshace la última operación; devuelve su etiqueta o None."""
+        return self.journal.undo(self)
+
+    def redo(self) -> Optional[str]:
+        """Rehace la última operación deshecha; devuelve su etiqueta o None."""
+        return self.journal.redo(self)
+
+    def _index_end(self) -> int:
+        return self.hdr.parts_index_offset + len(self._payloads) * PART_INDEX_STRIDE
+
+    def layout(self) -> np.ndarray:
+        """Offsets que tendrían las partes si el documento se serializara ahora."""
+        lengths = self.parts.lengths.astype(np.int64)
+        return self._index_end() + np.cumsum(self._spans.sizes()) - lengths
+
+    def part_offset(self, index: int) -> int:
+        """Offset de una parte en el layout actual, en O(log n)."""
+        if index < 0:
+            index += len(self._payloads)
+        return self._index_end() + self._spans.prefix(index + 1) - len(self._payloads[index])
+
+    # ----- Layout físico -----
+
+    def layout_records(self) -> np.ndarray:
+        """Copia de las entradas del índice con las longitudes y offsets del layout actual."""
+        records = self.parts.records.copy()
+        records['part_length'] = [len(d) for d in self._payloads]
+        records['part_offset'] = self.layout()
+        return records
+
+    def serialize(self, records: Optional[np.ndarray] = None) -> PieceTable:
+        """
+        Genera el layout físico del PMDL en una sola pasada.
+
+        Escribe el contador y el índice desde `records` (por defecto,
+        `layout_records()`) y encadena las partes sin copiar sus bytes: el
+        resultado es una `PieceTable` cuyas piezas apuntan a los buffers del
+        documento. No modifica `parts`; `save` confirma el layout nuevo solo
+        cuando el archivo quedó escrito.
+        """
+        if records is None:
+            records = self.layout_records()
+
+        image = PieceTable(self._prefix)
+        image[0x5C:0x60] = struct.pack("<I", len(records))
+        image.append(records.tobytes())
+        for gap, data in zip(self._gaps, self._payloads):
+            image.append(gap)
+            image.append(data)
+        image.append(self._tail)
+        return image
+
+    # ----- Guardar / cerrar -----
+
+    def changed_ranges(self) -> List[Tuple[int, memoryview]]:
+        """
+        Rangos (offset, buffer) modificados desde el último guardado.
+
+        Solo tiene sentido mientras el layout no cambió: entradas del índice
+        marcadas en `parts.dirty` (agrupadas en tramos contiguos) y partes
+        reemplazadas por otras de la misma longitud.
+        """
+        ranges = []
+        base = self.hdr.parts_index_offset
+        dirty = np.flatnonzero(self.parts.dirty)
+        if len(dirty):
+            for run in np.split(dirty, np.flatnonzero(np.diff(dirty) != 1) + 1):
+                first, last = int(run[0]), int(run[-1]) + 1
+                ranges.append((base + first * PART_INDEX_STRIDE,
+                               self.parts.records[first:last].tobytes()))
+
+        for i in sorted(self._dirty_payloads):
+            ranges.append((self.parts[i].part_offset, self._payloads[i]))
+        return ranges
+
+    def _can_patch(self, path: str) -> bool:
+        """Indica si `path` puede actualizarse escribiendo solo los rangos modificados."""
+        if self._layout_changed or not isinstance(self._source, mmap.mmap):
+            return False
+        try:
+            if not os.path.samefile(path, self.path):
+                return False
+        except OSError:
+            return False
+
+        # El layout recalculado debe coincidir con el del archivo en disco
+        layout = self.layout()
+        if not np.array_equal(layout, self.parts.offsets):
+            return False
+        end = self._index_end() + self._spans.total()
+        return end + len(self._tail) == len(self._source) == os.path.getsize(path)
+
+    def _patch(self, ranges: List[Tuple[int, memoryview]]):
+        """
+        Escribe `ranges` en el archivo actual con escrituras posicionales.
+
+        Es la única escritura que no pasa por un temporal y `os.replace`, y se
+        acepta a propósito: solo se usa cuando el layout no cambió, de modo que
+        cada rango tiene el mismo tamaño que los bytes que reemplaza y el
+        contador, el índice y los offsets siguen valiendo en todo momento. Un
+        corte a mitad deja un PMDL con estructura válida, pero con solo parte
+        de los cambios (una entrada o una parte puede quedar a medio escribir).
+        A cambio, editar unas pocas entradas cuesta unos bytes en lugar de
+        reescribir el archivo entero. El `fsync` final garantiza que, al
+        volver, el guardado ya está en disco.
+        """
+        with open(self.path, "r+b") as f:
+            for offset, data in ranges:
+                _pwrite(f, data, offset)
+            os.fsync(f.fileno())
+
+    def save(self, path: str = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> "SaveResult":
+        """
+        Escribe el documento en `path` (por defecto, su ruta actual).
+
+        Si el layout no cambió y el destino es el archivo abierto, solo se
+        escriben los rangos modificados, directamente sobre el archivo (ver
+        `_patch` sobre lo que implica un corte a mitad). En otro caso el documento se
+        serializa en un archivo temporal junto al destino, pieza a pieza y sin
+        construir el archivo contiguo; tras `fsync` el temporal reemplaza al
+        destino de forma atómica y el documento vuelve a mapear el archivo
+        guardado. Si algo falla, el destino queda intacto.
+
+        Args:
+            path: Ruta destino.
+            progress: Se llama con (bytes escritos, total) durante la escritura
+                del temporal; si lanza una excepción, el guardado se aborta
+                sin tocar el destino ni el documento.
+
+        Returns:
+            Bytes escritos, duración y tipo de guardado.
+        """
+        path = path or self.path
+        start = time.perf_counter()
+
+        if self._can_patch(path):
+            ranges = self.changed_ranges()
+            self._patch(ranges)
+            self._dirty_payloads.clear()
+            self.parts.clear_dirty()
+            written = sum(len(data) for _, data in ranges)
+            return SaveResult(written, time.perf_counter() - start, patched=True)
+
+        records = self.layout_records()
+        image = self.serialize(records)
+        written = len(image)
+        tmp_path = _write_temp(path, image.iter_chunks(), written, progress)
+        del image
+
+        # Ninguna vista puede seguir apuntando al mapeo al reemplazar el archivo
+        try:
+            self._release()
+            self._unmap()
+            os.replace(tmp_path, path)
+        except Exception:
+            # El destino no cambió: el modelo se enlaza a una copia en memoria
+            # del temporal, ubicando las partes con el layout nuevo, y `parts`
+            # conserva el del último guardado
+            with open(tmp_path, "rb") as f:
+                self._bind(f.read(), records['part_offset'])
+            os.remove(tmp_path)
+            raise
+        _fsync_dir(path)
+
+        self.parts.records['part_length'] = records['part_length']
+        self.parts.records['part_offset'] = records['part_offset']
+        self.path = path
+        self._map(path)
+        self._bind(self._source)
+        self._dirty_payloads.clear()
+        self._layout_changed = False
+        self.parts.clear_dirty()
+        return SaveResult(written, time.perf_counter() - start, patched=False)
+
+    def close(self):
+        """Libera el contenido y el mapeo."""
+        self._release()
+        self._unmap()
+
+
+@dataclass
+class SaveResult:
+    """Resultado de `PmdlDocument.save`."""
+    bytes_written: int
+    seconds: float
+    patched: bool
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_written / self.seconds if self.seconds > 0 else float(self.bytes_written)
+
+
+def _write_temp(path: str, chunks: Iterable, total: int = 0,
+                progress: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Escribe `chunks` en un archivo temporal junto a `path` y devuelve su ruta.
+
+    La escritura pasa por un buffer grande, de modo que las piezas pequeñas
+    (cabecera, entradas, huecos) se agrupan y las grandes se escriben directas
+    desde su buffer de origen. El contenido queda en disco (`fsync`) antes de
+    devolver. `progress(escritos, total)` se llama cada `SAVE_CHUNK_SIZE` bytes.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb", buffering=SAVE_CHUNK_SIZE) as f:
+            done = reported = 0
+            for chunk in chunks:
+                f.write(chunk)
+                done += len(chunk)
+                if progress is not None and done - reported >= SAVE_CHUNK_SIZE:
+                    progress(done, total)
+                    reported = done
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            # mkstemp crea el archivo con 0600; un archivo nuevo usa los
+            # permisos por defecto del proceso
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def _fsync_dir(path: str):
+    """Persiste el renombrado en el directorio (solo POSIX)."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _pwrite(f, data, offset: int):
+    """Escribe `data` en `offset` sin depender de la posición actual del archivo."""
+    if hasattr(os, "pwrite"):
+        view = memoryview(data)
+        while len(view):
+            written = os.pwrite(f.fileno(), view, offset)
+            view = view[written:]
+            offset += written
+    else:
+        f.seek(offset)
+        f.write(data)
@@ -0,0 +1,22 @@
+"""
+Eventos de cambio sobre las partes de un documento PMDL.
+
+Las operaciones del núcleo describen qué filas cambiaron para que las vistas
+apliquen solo esas diferencias en lugar de redibujar todas las partes.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+
+PARTS_INSERTED = "inserted"      # filas nuevas en `indices` (posiciones finales)
+PARTS_REMOVED = "removed"        # filas quitadas en `indices` (posiciones previas)
+PARTS_UPDATED = "updated"        # filas cuyos datos cambiaron
+PARTS_RENUMBERED = "renumbered"  # filas desde `start` que cambiaron de número
+
+
+@dataclass(frozen=True)
+class PartsEvent:
+    """Cambio sobre las filas de partes, en orden ascendente."""
+    kind: str
+    indices: Tuple[int, ...] = ()
+    start: int = 0
@@ -0,0 +1,258 @@
+"""
+Historial de deshacer/rehacer del documento PMDL.
+
+Cada operación del núcleo se registra como una lista de cambios inversos
+compactos: solo se guardan los bytes quitados o insertados y las entradas del
+índice afectadas, nunca una copia del archivo.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class Change(ABC):
+    """Cambio reversible sobre un `PmdlDocument`."""
+    __slots__ = ()
+
+    @abstractmethod
+    def undo(self, doc):
+        """Restablece el estado previo al cambio."""
+
+    @abstractmethod
+    def redo(self, doc):
+        """Vuelve a aplicar el cambio."""
+
+    def merge(self, other: "Change") -> bool:
+        """Absorbe `other`, registrado justo después, si continúa este cambio."""
+        return False
+
+
+class SetPartChange(Change):
+    """
+    Reemplazo de los bytes de una parte.
+
+    Solo se guarda el tramo central que difiere entre el contenido anterior y
+    el nuevo; el prefijo y el sufijo comunes se toman de la parte actual.
+    """
+    __slots__ = ('index', 'start', 'old_mid', 'new_mid')
+
+    def __init__(self, index: int, old, new):
+        old_arr = np.frombuffer(old, dtype=np.uint8)
+        new_arr = np.frombuffer(new, dtype=np.uint8)
+        n = min(len(old_arr), len(new_arr))
+
+        diff = np.flatnonzero(old_arr[:n] != new_arr[:n])
+        start = int(diff[0]) if len(diff) else n
+
+        n -= start
+        tail_diff = np.flatnonzero(old_arr[len(old_arr) - n:][::-1] != new_arr[len(new_arr) - n:][::-1])
+        suffix = int(tail_diff[0]) if len(tail_diff) else n
+
+        self.index = index
+        self.start = start
+        self.old_mid = bytes(old[start:len(old) - suffix])
+        self.new_mid = bytes(new[start:len(new) - suffix])
+
+    def _swap(self, doc, current_mid: bytes, target_mid: bytes):
+        data = doc.part_data(self.index)
+        end = self.start + len(current_mid)
+        doc.set_part_data(self.index, b"".join((data[:self.start], target_mid, data[end:])))
+
+    def undo(self, doc):
+        self._swap(doc, self.new_mid, self.old_mid)
+
+    def redo(self, doc):
+        self._swap(doc, self.old_mid, self.new_mid)
+
+
+class InsertPartsChange(Change):
+    """Alta de partes en posiciones dadas (posiciones finales, ascendentes)."""
+    __slots__ = ('positions', 'rows', 'payloads', 'gaps')
+
+    def __init__(self, positions: Sequence[int], rows: np.ndarray, payloads: list, gaps: list):
+        self.positions = list(positions)
+        self.rows = rows
+        self.payloads = payloads
+        self.gaps = gaps
+
+    def undo(self, doc):
+        doc.remove_parts(self.positions)
+
+    def redo(self, doc):
+        doc.insert_parts(self.positions, self.rows, self.payloads, self.gaps)
+
+
+class RemovePartsChange(Change):
+    """
+    Baja de partes.
+
+    Guarda las entradas y bytes quitados, y el hueco original de las partes
+    conservadas que recibieron el hueco de una parte quitada.
+    """
+    __slots__ = ('positions', 'rows', 'payloads', 'gaps', 'kept_gaps')
+
+    def __init__(self, positions: Sequence[int], rows: np.ndarray, payloads: list, gaps: list,
+                 kept_gaps: list):
+        self.positions = list(positions)
+        self.rows = rows
+        self.payloads = payloads
+        self.gaps = gaps
+        self.kept_gaps = kept_gaps
+
+    def undo(self, doc):
+        doc.insert_parts(self.positions, self.rows, self.payloads, self.gaps)
+        for index, gap in self.kept_gaps:
+            doc.set_part_gap(index, gap)
+
+    def redo(self, doc):
+        doc.remove_parts(self.positions)
+
+
+class SetFieldsChange(Change):
+    """
+    Edición de columnas del índice (capa, opacidad, función) de varias partes.
+
+    Solo se guardan las columnas editadas de las filas afectadas, antes y
+    después del cambio.
+    """
+    __slots__ = ('indices', 'before', 'after')
+
+    def __init__(self, indices: Sequence[int], before: Dict[str, np.ndarray],
+                 after: Dict[str, np.ndarray]):
+        self.indices = list(indices)
+        self.before = before
+        self.after = after
+
+    def undo(self, doc):
+        doc.set_part_fields(self.indices, self.before)
+
+    def redo(self, doc):
+        doc.set_part_fields(self.indices, self.after)
+
+    def merge(self, other: Change) -> bool:
+        # Arrastrar un slider entrega muchas ediciones seguidas de las mismas
+        # partes y columnas: forman un solo paso
+        if not isinstance(other, SetFieldsChange) or other.indices != self.indices:
+            return False
+        if other.after.keys() != self.after.keys():
+            return False
+        self.after = other.after
+        return True
+
+
+class DropResidueChange(Change):
+    """Descarte de los bytes posteriores a la última parte."""
+    __slots__ = ('tail',)
+
+    def __init__(self, tail: bytes):
+        self.tail = tail
+
+    def undo(self, doc):
+        doc.set_residue(self.tail)
+
+    def redo(self, doc):
+        doc.drop_residue()
+
+
+@dataclass
+class Step:
+    """Paso del historial: los cambios de una operación del usuario."""
+    label: str
+    changes: List[Change] = field(default_factory=list)
+
+
+class Journal:
+    """
+    Pilas de deshacer/rehacer de un documento.
+
+    Los cambios registrados dentro de `group()` forman un único paso; fuera de
+    un grupo cada cambio es su propio paso. Registrar un paso nuevo vacía la
+    pila de rehacer. Un paso de un solo cambio que continúa al recién
+    registrado (ver `Change.merge`) se funde con él.
+    """
+
+    def __init__(self):
+        self._undo: List[Step] = []
+        self._redo: List[Step] = []
+        self._open: Optional[Step] = None
+        self._last: Optional[Step] = None
+        self._depth = 0
+        self.replaying = False
+
+    @contextmanager
+    def group(self, label: str):
+        """Agrupa los cambios registrados dentro del bloque en un solo paso."""
+        if self._depth == 0:
+            self._open = Step(label)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                step, self._open = self._open, None
+                if step.changes:
+                    self._push(step)
+
+    def record(self, change: Change):
+        """Registra un cambio (ignorado mientras se deshace o rehace)."""
+        if self.replaying:
+            return
+        if self._open is not None:
+            self._open.changes.append(change)
+        else:
+            self._push(Step("", [change]))
+
+    def _push(self, step: Step):
+        last = self._last
+        if (last is not None and len(last.changes) == len(step.changes) == 1
+                and last.changes[0].merge(step.changes[0])):
+            return
+        self._undo.append(step)
+        self._redo.clear()
+        self._last = step
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self, doc) -> Optional[str]:
+        """Deshace el último paso; devuelve su etiqueta o None si no hay pasos."""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._last = None
+        self._replay(doc, [c.undo for c in reversed(step.changes)])
+        self._redo.append(step)
+        return step.label
+
+    def redo(self, doc) -> Optional[str]:
+        """Rehace el último paso deshecho; devuelve su etiqueta o None si no hay pasos."""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._last = None
+        self._replay(doc, [c.redo for c in step.changes])
+        self._undo.append(step)
+        return step.label
+
+    def _replay(self, doc, actions):
+        self.replaying = True
+        try:
+            for action in actions:
+                action(doc)
+        finally:
+            self.replaying = False
+
+    def clear(self):
+        """Vacía ambas pilas."""
+        self._undo.clear()
+        self._redo.clear()
+        self._last = None
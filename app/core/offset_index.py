@@ -0,0 +1,82 @@
+"""
+Índice de offsets por sumas prefijas (árbol de Fenwick).
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+
+class OffsetIndex:
+    """
+    Tamaños de una secuencia de bloques contiguos con sumas prefijas en O(log n).
+
+    El offset de un bloque es la suma de los tamaños anteriores: consultarlo
+    (`prefix`) o cambiar el tamaño de un bloque (`add` / `set`), lo que desplaza
+    a todos los siguientes, cuesta O(log n). Las altas y bajas en medio de la
+    secuencia reconstruyen el árbol en una pasada vectorizada.
+    """
+
+    def __init__(self, sizes: Iterable[int] = ()):
+        self._build(np.fromiter(sizes, dtype=np.int64))
+
+    def _build(self, sizes: np.ndarray):
+        n = len(sizes)
+        prefix = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(sizes, out=prefix[1:])
+        # Nodo i (base 1) = suma de (i - lowbit(i), i]
+        idx = np.arange(1, n + 1)
+        tree = prefix[idx] - prefix[idx - (idx & -idx)]
+
+        self._sizes: List[int] = sizes.tolist()
+        self._tree: List[int] = [0] + tree.tolist()
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def prefix(self, index: int) -> int:
+        """Suma de los tamaños de los bloques [0, index)."""
+        total = 0
+        tree = self._tree
+        while index > 0:
+            total += tree[index]
+            index &= index - 1
+        return total
+
+    def add(self, index: int, delta: int):
+        """Suma `delta` al tamaño de un bloque (desplaza a todos los siguientes)."""
+        if delta == 0:
+            return
+        self._sizes[index] += delta
+        tree = self._tree
+        n = len(self._sizes)
+        i = index + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def set(self, index: int, size: int):
+        """Fija el tamaño de un bloque."""
+        self.add(index, size - self._sizes[index])
+
+    def append(self, size: int):
+        """Agrega un bloque al final."""
+        self._sizes.append(size)
+        i = len(self._sizes)
+        low = i & -i
+        self._tree.append(size + self.prefix(i - 1) - self.prefix(i - low))
+
+    def insert(self, index: int, size: int):
+        """Inserta un bloque en `index`."""
+        sizes = self.sizes()
+        self._build(np.insert(sizes, index, size))
+
+    def delete(self, indices):
+        """Elimina uno o varios bloques."""
+        self._build(np.delete(self.sizes(), indices))
+
+    def sizes(self) -> np.ndarray:
+        return np.array(self._sizes, dtype=np.int64)
+
+    def total(self) -> int:
+        """Suma de los tamaños de todos los bloques."""
+        return self.prefix(len(self._sizes))
@@ -1,103 +1,114 @@
-import struct
-from typing import List
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
 from .parts_index import PartIndexEntry
-from .header import PmdlHeader
+from .document import PmdlDocument
 from .converters import opacity_u16_from_percent
 from .flags import FLAG_MAP_LABEL_TO_VALUE
 
 
-def export_part(blob: bytearray, part: PartIndexEntry) -> bytes:
+@contextmanager
+def export_part(doc: PmdlDocument, part_index: int) -> Iterator[memoryview]:
     """
-    Extrae los bytes de una parte específica.
+    Extrae los bytes de una parte específica, sin copiarlos.
+    
+    Se usa con `with`: la vista apunta al buffer del documento y se libera al
+    salir del bloque, de modo que no puede quedar reteniendo el mapeo del
+    archivo. Para conservar los bytes, copiarlos dentro del bloque.
     
     Args:
-        blob: Datos del archivo PMDL.
-        part: Entrada de la parte a exportar.
+        doc: Documento PMDL.
+        part_index: Índice de la parte a exportar.
         
-    Returns:
-        Bytes de la parte.
+    Yields:
+        Vista de solo lectura de los bytes de la parte.
         
     Raises:
         ValueError: Si el rango es inválido.
     """
-    off = part.part_offset
+    part = doc.parts[part_index]
+    data = doc.part_data(part_index)
     ln = part.part_length
     
-    if off < 0 or ln <= 0 or off + ln > len(blob):
-        raise ValueError(f"Rango inválido al exportar (offset={off}, longitud={ln}).")
+    if ln <= 0 or len(data) < ln:
+        raise ValueError(f"Rango inválido al exportar (offset={part.part_offset}, longitud={ln}).")
     
-    return bytes(blob[off:off + ln])
+    view = memoryview(data).toreadonly()
+    try:
+        yield view
+    finally:
+        view.release()
 
 
-def delete_part(blob: bytearray, hdr: PmdlHeader, parts: List[PartIndexEntry], part_index: int):
+def delete_part(doc: PmdlDocument, part_index: int,
+                progress: Optional[Callable[[int, int], None]] = None):
     """
-    Elimina una parte del PMDL y ajusta el índice.
+    Elimina una parte del PMDL.
+    
+    El contador, el índice y los offsets se recalculan al serializar.
     
     Args:
-        blob: Datos del archivo PMDL (modificado in-place).
-        hdr: Header del PMDL (modificado in-place).
-        parts: Lista de partes (modificada in-place).
+        doc: Documento PMDL (modificado in-place).
         part_index: Índice de la parte a eliminar.
+        progress: Ver `delete_parts`.
         
     Raises:
         ValueError: Si el índice es inválido.
     """
-    if not (0 <= part_index < len(parts)):
-        raise ValueError("Índice de parte inválido.")
-    
-    index_base = hdr.parts_index_offset
-    stride = 0x20
-    old_count = hdr.part_count
-    
-    # Parte a borrar
-    p = parts[part_index]
-    off = p.part_offset
-    ln = p.part_length
-    
-    # (a) Eliminar bytes de la PARTE en el blob
-    del blob[off:off + ln]
-    
-    # (b) Restar longitud a offsets de partes que estaban debajo
-    for j in range(part_index + 1, len(parts)):
-        parts[j].part_offset -= ln
-    
-    # (c.1) Eliminar bloque de índice (0x20)
-    entry_off = index_base + part_index * stride
-    del blob[entry_off:entry_off + stride]
-    
-    # (c.2) Restar 0x20 a offsets de inicio de parte
-    for j in range(len(parts)):
-        if j == part_index:
-            continue
-        parts[j].part_offset -= stride
-    
-    # (c.3) Quitar entrada en memoria
-    parts.pop(part_index)
+    delete_parts(doc, [part_index], progress)
+
+
+def delete_parts(doc: PmdlDocument, indices: Sequence[int],
+                 progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Elimina varias partes del PMDL en una sola pasada.
     
-    # (d) Decrementar contador de partes
-    new_count = old_count - 1
-    struct.pack_into("<I", blob, 0x5C, new_count)
-    hdr.part_count = new_count
+    Las partes y sus entradas se quitan del modelo de una vez, sin importar
+    cuántas sean; el contador, el índice y los offsets se recalculan al
+    serializar.
     
-    # (e) Truncar residuos
-    if hdr.part_count > 0:
-        last = parts[-1]
-        end_of_model = last.part_offset + last.part_length
-    else:
-        end_of_model = index_base
+    Args:
+        doc: Documento PMDL (modificado in-place).
+        indices: Índices de las partes a eliminar.
+        progress: Se llama con (0, cantidad) justo antes de modificar el
+            documento; si lanza una excepción, el documento queda intacto.
+        
+    Raises:
+        ValueError: Si no hay índices o alguno es inválido.
+    """
+    indices = sorted(set(indices))
+    if not indices:
+        raise ValueError("No hay partes seleccionadas.")
+    if indices[0] < 0 or indices[-1] >= len(doc.parts):
+        raise ValueError("Índice de parte inválido.")
+    if progress is not None:
+        progress(0, len(indices))
     
-    if len(blob) > end_of_model:
-        del blob[end_of_model:]
+    with doc.journal.group("Borrar partes"):
+        # (a) Quitar las partes y sus entradas del modelo
+        doc.remove_parts(indices)
+        
+        # (b) Truncar residuos
+        doc.drop_residue()
 
 
-def import_part(blob: bytearray, hdr: PmdlHeader, parts: List[PartIndexEntry], new_part_data: bytes):
+def _next_part_id(doc: PmdlDocument) -> int:
+    """ID para una parte nueva: misma capa alta que la última parte, capa baja + 1."""
+    if len(doc.parts) == 0:
+        return 0x0000
+    last_id = doc.parts[-1].part_id
+    new_id_low = min(0xFF, (last_id & 0xFF) + 1)
+    return (last_id & 0xFF00) | new_id_low
+
+
+def import_part(doc: PmdlDocument, new_part_data: bytes):
     """
-    Importa una nueva parte al PMDL.
+    Importa una nueva parte al final del PMDL.
     
     Args:
-        blob: Datos del archivo PMDL (modificado in-place).
-        hdr: Header del PMDL (modificado in-place).
-        parts: Lista de partes (modificada in-place).
+        doc: Documento PMDL (modificado in-place).
         new_part_data: Bytes de la nueva parte.
         
     Returns:
@@ -109,122 +120,52 @@ def import_part(blob: bytearray, hdr: PmdlHeader, parts: List[PartIndexEntry], n
     if not new_part_data:
         raise ValueError("La parte está vacía.")
     
-    # 1) Insertar bloque de índice al final
-    old_count = hdr.part_count
-    index_base = hdr.parts_index_offset
-    index_end_before = index_base + old_count * 0x20
-    blob[index_end_before:index_end_before] = b"\x00" * 0x20
-    
-    # 2) Actualizar contador
-    new_count = old_count + 1
-    struct.pack_into("<I", blob, 0x5C, new_count)
-    hdr.part_count = new_count
-    
-    # 3) Sumar 0x20 a todos los offsets existentes
-    stride = 0x20
-    for p in parts:
-        p.part_offset += stride
-    
-    # 4) Punto de inserción
-    if old_count > 0:
-        last = parts[-1]
-        insert_pos = last.part_offset + last.part_length
-    else:
-        insert_pos = index_base + new_count * stride
-    
-    # 5) Insertar bytes de la parte
-    blob[insert_pos:insert_pos] = new_part_data
-    
-    # 6) Preparar nuevo índice
-    if old_count > 0:
-        last_id_low = parts[-1].part_id & 0xFF
-        new_id_low = min(0xFF, last_id_low + 1)
-        new_part_id = (parts[-1].part_id & 0xFF00) | new_id_low
-    else:
-        new_part_id = 0x0000
-    
-    new_opacity = 0xFFFF
-    new_flag = 0x00000000
-    new_offset = insert_pos
-    new_length = len(new_part_data)
-    
-    # 7) Escribir bloque de índice
-    new_entry_off = index_base + old_count * stride
-    struct.pack_into("<H", blob, new_entry_off + 0x00, new_part_id & 0xFFFF)
-    struct.pack_into("<H", blob, new_entry_off + 0x02, new_opacity & 0xFFFF)
-    struct.pack_into("<I", blob, new_entry_off + 0x04, new_offset & 0xFFFFFFFF)
-    struct.pack_into("<I", blob, new_entry_off + 0x08, new_length & 0xFFFFFFFF)
-    struct.pack_into("<I", blob, new_entry_off + 0x0C, new_flag & 0xFFFFFFFF)
-    
-    # 8) Actualizar modelo en memoria
-    parts.append(PartIndexEntry(
-        part_id=new_part_id,
-        opacity=new_opacity,
-        part_offset=new_offset,
-        part_length=new_length,
-        special_flag=new_flag
-    ))
-    
-    # 9) Truncar residuos
-    end_of_model = new_offset + new_length
-    if len(blob) > end_of_model:
-        del blob[end_of_model:]
+    # 1) Preparar nuevo índice
+    entry = PartIndexEntry(
+        part_id=_next_part_id(doc),
+        opacity=0xFFFF,
+        part_offset=0,
+        part_length=len(new_part_data),
+        special_flag=0x00000000
+    )
+    
+    with doc.journal.group("Importar parte"):
+        # 2) Agregar la parte al modelo
+        doc.append_part(entry, new_part_data)
+        
+        # 3) Truncar residuos
+        doc.drop_residue()
     
-    return new_offset, new_length
+    return doc.part_offset(len(doc.parts) - 1), entry.part_length
 
-def replace_part(blob: bytearray, hdr: PmdlHeader, parts: List[PartIndexEntry], part_data: bytearray, id_part: int):
+def replace_part(doc: PmdlDocument, part_data: bytearray, id_part: int):
     """
     remplaza una parte existen
-    :param blob: Datos del archivo PMDL.
-    :param hdr: Header del PMDL.
-    :param parts: Lista de partes.
+    :param doc: Documento PMDL.
     :param part_data: Bytes de la nueva parte.
     :param id_part: Identificador de la parte del PMDL.
     """
+    if not (0 <= id_part < len(doc.parts)):
+        raise ValueError("Índice de parte inválido.")
 
-    offset_part = parts[id_part].part_offset
-    old_length = parts[id_part].part_length
-    offset_part_end = offset_part + old_length
-
-    # 1️⃣ Reemplazar datos de la parte EN SITIO
-    blob[offset_part:offset_part_end] = part_data
-
-    # 2️⃣ Actualizar longitud
-    new_length = len(part_data)
-    parts[id_part].part_length = new_length
-
-    # 3️⃣ Calcular diferencia de tamaño
-    delta = new_length - old_length
-
-    # 4️⃣ Ajustar offsets de las partes siguientes
-    if delta != 0:
-        for i in range(id_part + 1, len(parts)):
-            parts[i].part_offset += delta
-
-    # 5️⃣ Reescribir tabla de índices
-    base_index = hdr.parts_index_offset
-
-    for i, p in enumerate(parts):
-        entry_off = base_index + i * 0x20
-
-        struct.pack_into("<I", blob, entry_off + 4,  p.part_offset)
-        struct.pack_into("<I", blob, entry_off + 8,  p.part_length)
-
-    return parts
+    # Los offsets de las partes siguientes se recalculan al serializar
+    with doc.journal.group("Reemplazar parte"):
+        doc.set_part_data(id_part, part_data)
 
+    return doc.parts
 
 
-def add_part_from_secondary(blob_dest: bytearray, hdr_dest: PmdlHeader, parts_dest: List[PartIndexEntry],
-                            blob_src: bytearray, part_src: PartIndexEntry):
+def add_part_from_secondary(doc_dest: PmdlDocument, doc_src: PmdlDocument, part_index: int,
+                            progress: Optional[Callable[[int, int], None]] = None):
     """
     Agrega una parte desde un PMDL secundario al principal.
     
     Args:
-        blob_dest: Blob del PMDL destino (modificado in-place).
-        hdr_dest: Header del PMDL destino (modificado in-place).
-        parts_dest: Lista de partes del destino (modificada in-place).
-        blob_src: Blob del PMDL origen.
-        part_src: Entrada de la parte a copiar.
+        doc_dest: Documento PMDL destino (modificado in-place).
+        doc_src: Documento PMDL origen.
+        part_index: Índice de la parte a copiar en el origen.
+        progress: Se llama con (0, 1) justo antes de modificar el destino; si
+            lanza una excepción, el destino queda intacto.
         
     Returns:
         Tupla (offset, length) de la parte agregada.
@@ -232,105 +173,147 @@ def add_part_from_secondary(blob_dest: bytearray, hdr_dest: PmdlHeader, parts_de
     Raises:
         ValueError: Si el rango es inválido.
     """
-    src_off = part_src.part_offset
+    part_src = doc_src.parts[part_index]
+    src_data = doc_src.part_data(part_index)
     src_len = part_src.part_length
     
-    if src_off < 0 or src_len <= 0 or src_off + src_len > len(blob_src):
+    if src_len <= 0 or len(src_data) < src_len:
         raise ValueError("Rango inválido en la parte del PMDL secundario.")
     
-    src_bytes = bytes(blob_src[src_off:src_off + src_len])
-    src_id = part_src.part_id & 0xFFFF
-    src_opac = part_src.opacity & 0xFFFF
-    src_flag = part_src.special_flag & 0xFFFFFFFF
-    
-    # Insertar bloque de índice
-    index_base = hdr_dest.parts_index_offset
-    stride = 0x20
-    old_count = hdr_dest.part_count
-    index_end_before = index_base + old_count * stride
-    
-    blob_dest[index_end_before:index_end_before] = b"\x00" * stride
-    
-    # Actualizar contador
-    new_count = old_count + 1
-    struct.pack_into("<I", blob_dest, 0x5C, new_count)
-    hdr_dest.part_count = new_count
-    
-    # Sumar +0x20 a todos los offsets
-    for p in parts_dest:
-        p.part_offset += stride
-    
-    # Punto de inserción
-    if old_count > 0:
-        last = parts_dest[-1]
-        insert_pos = last.part_offset + last.part_length
-    else:
-        insert_pos = index_base + new_count * stride
-    
-    # Insertar bytes
-    blob_dest[insert_pos:insert_pos] = src_bytes
-    
-    # Escribir índice
-    new_entry_off = index_base + old_count * stride
-    struct.pack_into("<H", blob_dest, new_entry_off + 0x00, src_id)
-    struct.pack_into("<H", blob_dest, new_entry_off + 0x02, src_opac)
-    struct.pack_into("<I", blob_dest, new_entry_off + 0x04, insert_pos)
-    struct.pack_into("<I", blob_dest, new_entry_off + 0x08, src_len)
-    struct.pack_into("<I", blob_dest, new_entry_off + 0x0C, src_flag)
-    
-    # Actualizar modelo
-    parts_dest.append(PartIndexEntry(
-        part_id=src_id,
-        opacity=src_opac,
-        part_offset=insert_pos,
+    entry = PartIndexEntry(
+        part_id=part_src.part_id & 0xFFFF,
+        opacity=part_src.opacity & 0xFFFF,
+        part_offset=0,
         part_length=src_len,
-        special_flag=src_flag
-    ))
-    
-    # Truncar residuos
-    end_of_model = insert_pos + src_len
-    if len(blob_dest) > end_of_model:
-        del blob_dest[end_of_model:]
+        special_flag=part_src.special_flag & 0xFFFFFFFF
+    )
+    if progress is not None:
+        progress(0, 1)
+    
+    with doc_dest.journal.group("Agregar parte desde secundario"):
+        # Agregar parte al modelo
+        doc_dest.append_part(entry, src_data)
+        
+        # Truncar residuos
+        doc_dest.drop_residue()
     
-    return insert_pos, src_len
+    return doc_dest.part_offset(len(doc_dest.parts) - 1), src_len
 
 
-def sync_parts_from_ui(blob: bytearray, hdr: PmdlHeader, parts: List[PartIndexEntry], 
-                       ui_data: List[dict]):
+def add_parts_from_secondary(doc_dest: PmdlDocument, doc_src: PmdlDocument, indices: Sequence[int],
+                             progress: Optional[Callable[[int, int], None]] = None):
     """
-    Sincroniza las partes en memoria con los datos de la UI.
+    Agrega varias partes desde un PMDL secundario al principal.
+    
+    El índice del destino crece una sola vez y los bytes de todas las partes
+    se agregan en un único bloque contiguo.
     
     Args:
-        blob: Datos del archivo PMDL (modificado in-place).
-        hdr: Header del PMDL.
-        parts: Lista de partes (modificada in-place).
-        ui_data: Lista de diccionarios con 'depth', 'opacity_pct', 'flag_label'.
+        doc_dest: Documento PMDL destino (modificado in-place).
+        doc_src: Documento PMDL origen.
+        indices: Índices de las partes a copiar en el origen, en orden.
+        progress: Se llama con (partes leídas, total) mientras se leen las
+            partes del origen, antes de modificar el destino; si lanza una
+            excepción, el destino queda intacto.
+        
+    Returns:
+        Lista de tuplas (offset, length) de las partes agregadas.
+        
+    Raises:
+        ValueError: Si no hay índices o algún rango es inválido.
     """
-    for i, data in enumerate(ui_data):
-        if i >= len(parts):
-            break
+    if not indices:
+        raise ValueError("No hay partes seleccionadas.")
+    
+    entries, datas = [], []
+    for done, part_index in enumerate(indices):
+        if progress is not None:
+            progress(done, len(indices))
+        if not (0 <= part_index < len(doc_src.parts)):
+            raise ValueError("Índice de parte (secundario) inválido.")
         
-        # Capa/ID
-        low = data.get('depth', 0) & 0xFF
-        current = parts[i].part_id
-        parts[i].part_id = (current & 0xFF00) | low
+        part_src = doc_src.parts[part_index]
+        src_data = doc_src.part_data(part_index)
+        src_len = part_src.part_length
         
-        # Opacidad
-        pct = max(0, min(100, data.get('opacity_pct', 100)))
-        parts[i].opacity = opacity_u16_from_percent(pct)
+        if src_len <= 0 or len(src_data) < src_len:
+            raise ValueError("Rango inválido en la parte del PMDL secundario.")
         
-        # Función
-        label = data.get('flag_label', 'Ninguna')
-        value = FLAG_MAP_LABEL_TO_VALUE.get(label, 0x00)
-        parts[i].special_flag = value
+        entries.append(PartIndexEntry(
+            part_id=part_src.part_id & 0xFFFF,
+            opacity=part_src.opacity & 0xFFFF,
+            part_offset=0,
+            part_length=src_len,
+            special_flag=part_src.special_flag & 0xFFFFFFFF
+        ))
+        datas.append(src_data)
+    if progress is not None:
+        progress(len(indices), len(indices))
+    
+    first = len(doc_dest.parts)
+    with doc_dest.journal.group("Agregar partes desde secundario"):
+        # Agregar partes al modelo
+        doc_dest.append_parts(entries, datas)
+        
+        # Truncar residuos
+        doc_dest.drop_residue()
     
-    # Escribir en blob
-    base = hdr.parts_index_offset
-    stride = 0x20
-    for i, p in enumerate(parts):
-        off = base + i * stride
-        struct.pack_into("<H", blob, off + 0x00, p.part_id & 0xFFFF)
-        struct.pack_into("<H", blob, off + 0x02, p.opacity & 0xFFFF)
-        struct.pack_into("<I", blob, off + 0x04, p.part_offset & 0xFFFFFFFF)
-        struct.pack_into("<I", blob, off + 0x08, p.part_length & 0xFFFFFFFF)
-        struct.pack_into("<I", blob, off + 0x0C, p.special_flag & 0xFFFFFFFF)
\ No newline at end of file
+    offsets = doc_dest.layout()[first:]
+    return [(int(off), entry.part_length) for off, entry in zip(offsets, entries)]
+
+
+def apply_part_edits(doc: PmdlDocument, edits: Dict[int, dict]) -> List[int]:
+    """
+    Aplica en una sola pasada ediciones parciales de la tabla de partes.
+    
+    Cada parte trae solo los campos que se editaron; el resto conserva su
+    valor. Las partes que cambian quedan marcadas como modificadas y la
+    edición entra al historial como un paso. No se notifica a las vistas: la
+    edición viene de la tabla, que ya la muestra.
+    
+    Args:
+        doc: Documento PMDL (modificado in-place).
+        edits: Diccionario {índice: datos} con 'depth', 'opacity_pct' y/o
+            'flag_label'.
+    
+    Returns:
+        Índices de las partes que cambiaron.
+    """
+    rows = [i for i in sorted(edits) if 0 <= i < len(doc.parts)]
+    if not rows:
+        return []
+    
+    before = doc.parts.records[rows]
+    after = before.copy()
+    
+    # Capa/ID
+    sub = [k for k, i in enumerate(rows) if 'depth' in edits[i]]
+    if sub:
+        low = np.array([edits[rows[k]]['depth'] & 0xFF for k in sub], dtype=np.uint16)
+        after['part_id'][sub] = (after['part_id'][sub] & 0xFF00) | low
+    
+    # Opacidad
+    sub = [k for k, i in enumerate(rows) if 'opacity_pct' in edits[i]]
+    if sub:
+        after['opacity'][sub] = [
+            opacity_u16_from_percent(max(0, min(100, edits[rows[k]]['opacity_pct'])))
+            for k in sub
+        ]
+    
+    # Función
+    sub = [k for k, i in enumerate(rows) if 'flag_label' in edits[i]]
+    if sub:
+        after['special_flag'][sub] = [
+            FLAG_MAP_LABEL_TO_VALUE.get(edits[rows[k]]['flag_label'], 0x00)
+            for k in sub
+        ]
+    
+    changed = after != before
+    if not changed.any():
+        return []
+    indices = np.asarray(rows)[changed].tolist()
+    edited = [name for name in ('part_id', 'opacity', 'special_flag')
+              if (after[name] != before[name]).any()]
+    with doc.journal.group("Editar partes"):
+        doc.set_part_fields(indices, {name: after[name][changed] for name in edited}, notify=False)
+    return indices
@@ -1,9 +1,25 @@
-import struct
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, Sequence, Union
+
+import numpy as np
+
 from .header import PmdlHeader
 
 
+PART_INDEX_STRIDE = 0x20
+
+# Layout de una entrada del índice (0x20 bytes). Los 0x10 bytes finales no se
+# interpretan pero se conservan tal cual al reescribir el índice.
+PART_DTYPE = np.dtype([
+    ('part_id', '<u2'),
+    ('opacity', '<u2'),
+    ('part_offset', '<u4'),
+    ('part_length', '<u4'),
+    ('special_flag', '<u4'),
+    ('reserved', 'V16'),
+])
+
+
 @dataclass
 class PartIndexEntry:
     """Entrada del índice de partes."""
@@ -14,24 +30,141 @@ class PartIndexEntry:
     special_flag: int
 
 
-def parse_parts_index(blob: bytes, hdr: PmdlHeader) -> List[PartIndexEntry]:
-    entries: List[PartIndexEntry] = []
-    base = hdr.parts_index_offset
-    size = 0x20
-    
-    for i in range(hdr.part_count):
-        off = base + i * size
-        chunk = blob[off:off + size]
-        
-        if len(chunk) < size:
-            raise ValueError(f"Índice de partes incompleto en entrada {i}.")
-        
-        part_id, = struct.unpack_from("<H", chunk, 0x00)
-        opacity, = struct.unpack_from("<H", chunk, 0x02)
-        part_offset, = struct.unpack_from("<I", chunk, 0x04)
-        part_length, = struct.unpack_from("<I", chunk, 0x08)
-        special_flag, = struct.unpack_from("<I", chunk, 0x0C)
-        
-        entries.append(PartIndexEntry(part_id, opacity, part_offset, part_length, special_flag))
-    
-    return entries
\ No newline at end of file
+def _column(name: str) -> property:
+    """Crea una propiedad que lee/escribe una columna de la tabla para una fila."""
+    def fget(self) -> int:
+        return int(self._table.records[name][self._index])
+
+    def fset(self, value: int):
+        self._table.records[name][self._index] = value
+
+    return property(fget, fset)
+
+
+class PartRow:
+    """Vista de una fila de `PartTable` con la misma interfaz que `PartIndexEntry`."""
+    __slots__ = ('_table', '_index')
+
+    part_id = _column('part_id')
+    opacity = _column('opacity')
+    part_offset = _column('part_offset')
+    part_length = _column('part_length')
+    special_flag = _column('special_flag')
+
+    def __init__(self, table: "PartTable", index: int):
+        self._table = table
+        self._index = index
+
+
+class PartTable:
+    """
+    Índice de partes en formato columnar.
+
+    Cada fila es una entrada de 0x20 bytes del índice, almacenada en un array
+    estructurado de NumPy (`PART_DTYPE`). Las altas y bajas se hacen con
+    operaciones sobre columnas.
+
+    `dirty` marca las entradas cuyos metadatos se editaron desde el último
+    guardado, para sincronizar solo esas filas.
+    """
+
+    def __init__(self, records: np.ndarray = None):
+        if records is None:
+            records = np.zeros(0, dtype=PART_DTYPE)
+        self.records = records
+        self.dirty = np.zeros(len(records), dtype=bool)
+
+    @classmethod
+    def from_buffer(cls, blob, offset: int, count: int) -> "PartTable":
+        """
+        Lee `count` entradas del índice desde `blob` a partir de `offset`.
+
+        La región se interpreta con `np.frombuffer` (sin parseo por entrada) y
+        se desacopla del buffer con una única copia, de modo que el blob puede
+        seguir redimensionándose.
+        """
+        if count == 0:
+            return cls()
+        if offset + count * PART_INDEX_STRIDE > len(blob):
+            available = max(0, (len(blob) - offset) // PART_INDEX_STRIDE)
+            raise ValueError(f"Índice de partes incompleto en entrada {available}.")
+        view = np.frombuffer(blob, dtype=PART_DTYPE, count=count, offset=offset)
+        records = view.copy()
+        del view
+        return cls(records)
+
+    # ----- Acceso tipo lista -----
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> PartRow:
+        n = len(self.records)
+        if index < 0:
+            index += n
+        if not (0 <= index < n):
+            raise IndexError("Índice de parte fuera de rango.")
+        return PartRow(self, index)
+
+    def __iter__(self) -> Iterator[PartRow]:
+        for i in range(len(self.records)):
+            yield PartRow(self, i)
+
+    # ----- Columnas -----
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self.records['part_offset']
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self.records['part_length']
+
+    # ----- Altas / bajas -----
+
+    def append(self, entry: PartIndexEntry):
+        """Agrega una fila al final de la tabla."""
+        row = np.zeros(1, dtype=PART_DTYPE)
+        row['part_id'] = entry.part_id & 0xFFFF
+        row['opacity'] = entry.opacity & 0xFFFF
+        row['part_offset'] = entry.part_offset & 0xFFFFFFFF
+        row['part_length'] = entry.part_length & 0xFFFFFFFF
+        row['special_flag'] = entry.special_flag & 0xFFFFFFFF
+        self.records = np.concatenate((self.records, row))
+        self.dirty = np.append(self.dirty, True)
+
+    def extend(self, entries: Sequence[PartIndexEntry]):
+        """Agrega varias filas al final de la tabla con una sola concatenación."""
+        rows = np.zeros(len(entries), dtype=PART_DTYPE)
+        rows['part_id'] = [e.part_id & 0xFFFF for e in entries]
+        rows['opacity'] = [e.opacity & 0xFFFF for e in entries]
+        rows['part_offset'] = [e.part_offset & 0xFFFFFFFF for e in entries]
+        rows['part_length'] = [e.part_length & 0xFFFFFFFF for e in entries]
+        rows['special_flag'] = [e.special_flag & 0xFFFFFFFF for e in entries]
+        self.records = np.concatenate((self.records, rows))
+        self.dirty = np.concatenate((self.dirty, np.ones(len(rows), dtype=bool)))
+
+    def insert(self, positions: Sequence[int], rows: np.ndarray):
+        """
+        Inserta filas (`PART_DTYPE`) para que queden en `positions`.
+
+        `positions` son las posiciones finales, en orden ascendente.
+        """
+        before = np.asarray(positions) - np.arange(len(positions))
+        self.records = np.insert(self.records, before, rows)
+        self.dirty = np.insert(self.dirty, before, True)
+
+    def delete(self, indices: Union[int, Sequence[int]]):
+        """Elimina una o varias filas."""
+        self.records = np.delete(self.records, indices)
+        self.dirty = np.delete(self.dirty, indices)
+
+    # ----- Cambios pendientes -----
+
+    def clear_dirty(self):
+        """Descarta las marcas de modificación (tras guardar)."""
+        self.dirty[:] = False
+
+
+def parse_parts_index(blob: bytes, hdr: PmdlHeader) -> PartTable:
+    return PartTable.from_buffer(blob, hdr.parts_index_offset, hdr.part_count)
@@ -0,0 +1,145 @@
+"""
+Buffer de bytes editable basado en una tabla de piezas (piece table).
+"""
+from bisect import bisect_right
+from typing import Iterator, List
+
+
+class PieceTable:
+    """
+    Secuencia de bytes editable compuesta por piezas.
+
+    Cada pieza es un `memoryview` de solo lectura sobre un buffer inmutable: el
+    archivo original (mmap) o los bytes que se fueron insertando. Insertar,
+    borrar o reemplazar un rango solo corta y reordena piezas; el contenido
+    contiguo se construye una única vez con `tobytes()` o se recorre con
+    `iter_chunks()`.
+
+    Soporta el subconjunto de la interfaz de `bytearray` que usan las
+    operaciones del PMDL: `len`, lectura por índice o slice, asignación a
+    slice (reemplazo o inserción) y `del` de slices.
+    """
+
+    def __init__(self, source=b""):
+        self._pieces: List[memoryview] = []
+        self._starts: List[int] = []
+        self._length = 0
+
+        view = memoryview(source).cast("B")
+        if len(view):
+            self._pieces.append(view.toreadonly())
+            self._starts.append(0)
+            self._length = len(view)
+
+    # ----- Lectura -----
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop = self._bounds(key)
+            return b"".join(self._iter_range(start, stop))
+
+        index = key + self._length if key < 0 else key
+        if not (0 <= index < self._length):
+            raise IndexError("Índice fuera de rango.")
+        k = bisect_right(self._starts, index) - 1
+        return self._pieces[k][index - self._starts[k]]
+
+    def __bytes__(self) -> bytes:
+        return self.tobytes()
+
+    def tobytes(self) -> bytes:
+        """Construye el contenido contiguo."""
+        return b"".join(self._pieces)
+
+    def iter_chunks(self) -> Iterator[memoryview]:
+        """Itera las piezas en orden, sin copiarlas."""
+        return iter(self._pieces)
+
+    # ----- Edición -----
+
+    def __setitem__(self, key, data):
+        if not isinstance(key, slice):
+            raise TypeError("PieceTable solo admite asignación por slice.")
+        start, stop = self._bounds(key)
+        i = self._remove(start, stop)
+        self._insert(i, start, data)
+
+    def __delitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("PieceTable solo admite borrado por slice.")
+        start, stop = self._bounds(key)
+        self._remove(start, stop)
+
+    def append(self, data):
+        """Agrega `data` al final como una pieza nueva."""
+        self._insert(len(self._pieces), self._length, data)
+
+    # ----- Internos -----
+
+    def _bounds(self, key: slice):
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            raise ValueError("PieceTable no admite slices con paso.")
+        return start, max(start, stop)
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[memoryview]:
+        if start >= stop:
+            return
+        k = bisect_right(self._starts, start) - 1
+        while k < len(self._pieces) and self._starts[k] < stop:
+            piece_start = self._starts[k]
+            piece = self._pieces[k]
+            lo = max(start, piece_start) - piece_start
+            hi = min(stop, piece_start + len(piece)) - piece_start
+            yield piece[lo:hi]
+            k += 1
+
+    def _split(self, pos: int) -> int:
+        """Garantiza un borde de pieza en `pos` y devuelve el índice de la pieza que empieza ahí."""
+        if pos >= self._length:
+            return len(self._pieces)
+        k = bisect_right(self._starts, pos) - 1
+        piece_start = self._starts[k]
+        if piece_start == pos:
+            return k
+        piece = self._pieces[k]
+        cut = pos - piece_start
+        self._pieces[k:k + 1] = [piece[:cut], piece[cut:]]
+        self._starts.insert(k + 1, pos)
+        return k + 1
+
+    def _shift(self, first: int, delta: int):
+        starts = self._starts
+        for k in range(first, len(starts)):
+            starts[k] += delta
+
+    def _remove(self, start: int, stop: int) -> int:
+        """Quita el rango [start, stop) y devuelve el índice de pieza donde quedó el hueco."""
+        i = self._split(start)
+        if stop <= start:
+            return i
+        j = self._split(stop)
+        del self._pieces[i:j]
+        del self._starts[i:j]
+        size = stop - start
+        self._length -= size
+        self._shift(i, -size)
+        return i
+
+    def _insert(self, i: int, pos: int, data):
+        if isinstance(data, bytes):
+            view = memoryview(data)
+        elif isinstance(data, memoryview) and data.readonly:
+            view = data.cast("B")
+        else:
+            view = memoryview(bytes(data))
+        size = len(view)
+        if size == 0:
+            return
+        self._pieces.insert(i, view)
+        self._starts.insert(i, pos)
+        self._length += size
+        self._shift(i + 1, size)
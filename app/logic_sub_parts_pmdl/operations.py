@@ -1,67 +1,87 @@
 import struct
+from contextlib import contextmanager
+from typing import Iterator, Sequence
 
-from app.logic_sub_parts_pmdl.sub_parts_index import SubPartIndexEntry
+import numpy as np
 
+from app.logic_sub_parts_pmdl.part_store import PartStore
+from app.logic_sub_parts_pmdl.sub_parts_index import SubPartIndexEntry, SubPartTable, read_subpart_header
+from app.logic_sub_parts_pmdl.vertices import transform_positions
 
-def export_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry) -> bytes:
+
+@contextmanager
+def export_sub_part(blob: PartStore, part: int, subpart: SubPartIndexEntry) -> Iterator[memoryview]:
     """
-    Exporta una subparte
-    :param blob: blob de la part
+    Exporta una subparte; se usa con `with`
+    :param blob: partes del documento
     :param part: parte donde esta ubicada la subpart
     :param subpart: info de la subpart
-
+    :return: vista de solo lectura de los vertices (sin copia), liberada al
+        salir del bloque
     """
-    data_part = blob.get(f"{part}", None)
-
-    if data_part is None:
-        raise ValueError("la parte no existe en memoria")
-
     offset = subpart.sub_part_offset
     size = calc_subpart_size(subpart.num_vertices, subpart.num_bones)
 
-    return bytes(data_part[offset: offset + size])
+    with blob.view(part) as data_part:
+        view = data_part[offset: offset + size]
+        try:
+            yield view
+        finally:
+            view.release()
 
-def import_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry, data_subpart: bytearray):
+def import_sub_part(blob: PartStore, part: int, subpart: SubPartIndexEntry, data_subpart: bytearray,
+                    inf_subpart: bytearray = None):
     """
     Reemplaza una subpart existente en memoria
-    :param blob: blob de la part
+    :param blob: partes del documento
     :param part: parte donde esta ubicada la subpart
     :param subpart: info de la subpart
     :param data_subpart: data de la subpart a importar
+    :param inf_subpart: info de la subpart a importar (opcional); se copia al
+        header de la subpart conservando su offset
     :return: tupla (parte actualizad, size)
     """
-    data_part = blob.get(f"{part}", None)
+    data_part = blob.copy(part)
 
     if not data_part:
         raise ValueError("la parte no existe en memoria")
 
+    cant = replace_sub_part_in(data_part, subpart, data_subpart, inf_subpart)
+
+    return data_part, cant
+
+def replace_sub_part_in(data_part: bytearray, subpart: SubPartIndexEntry, data_subpart: bytearray,
+                        inf_subpart: bytearray = None) -> int:
+    """
+    Reemplaza los vertices de una subpart directamente en `data_part`.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param subpart: info de la subpart
+    :param data_subpart: data de la subpart a importar
+    :param inf_subpart: info de la subpart a importar (opcional)
+    :return: diferencia de tamaño entre la subpart nueva y la anterior
+    """
     offset = subpart.sub_part_offset
     size = calc_subpart_size(subpart.num_vertices, subpart.num_bones)
 
-    # reemplazar la subpart
-    data_part = data_part[:offset] + data_subpart + data_part[offset + size:]
-    data_part = bytearray(data_part)
+    # reemplazar la subpart (un solo movimiento de la cola de la parte)
+    data_part[offset:offset + size] = data_subpart
+    cant = len(data_subpart) - size
 
-    # tamaño de la subpart importada
-    size_new = len(data_subpart)
-    cant = (offset+size_new) - (offset+size)
-    num_parts, = struct.unpack_from("<I", data_part, 0)
+    if inf_subpart is not None:
+        pos = 4 + 0x10 * subpart.sub_part
+        data_part[pos:pos + 0xC] = inf_subpart[:0xC]
 
     # actualizar offsets de las subparts en la parte
-    for i in range(subpart.sub_part + 2, num_parts + 1):
-        offset_subpart, = struct.unpack_from("<I", data_part, 0x10 * i)
-        offset_subpart+=cant
-        struct.pack_into("<I", data_part, 0x10 * i, offset_subpart)
-
-    # reemplazar la parte en memoria
-    # blob[part] = data_part
+    num_parts, = struct.unpack_from("<I", data_part, 0)
+    shift_subpart_offsets(data_part, subpart.sub_part + 1, num_parts, cant)
 
-    return data_part, cant
+    return cant
 
-def insert_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry, data_subpart: bytearray, inf_subpart: bytearray) -> tuple[bytearray, int, int]:
+def insert_sub_part(blob: PartStore, part: int, subpart: SubPartIndexEntry, data_subpart: bytearray, inf_subpart: bytearray) -> tuple[bytearray, int, int]:
     """
     inserta una subparte en la memoria
-    :param blob: blob de la part
+    :param blob: partes del documento
     :param part: parte donde esta ubicada la subpart
     :param subpart: info de la subpart donde se insertara
     :param data_subpart: data de la subpart a importar (vertices)
@@ -69,14 +89,26 @@ def insert_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry, data_subp
 
     :return: tupla (parte actualizad, cant a sumar, offset de la parte insertada)
     """
-    data_part = blob.get(f"{part}", None)
-    # print(len(data_part))
+    data_part = blob.copy(part)
 
     if not data_part:
         raise ValueError("la parte no existe en memoria")
 
-    data_part = bytearray(data_part)
+    res_cant, offser_insert = insert_sub_part_in(data_part, subpart, data_subpart, inf_subpart)
 
+    return data_part, res_cant, offser_insert - 0x10
+
+def insert_sub_part_in(data_part: bytearray, subpart: SubPartIndexEntry, data_subpart: bytearray,
+                       inf_subpart: bytearray) -> tuple[int, int]:
+    """
+    Inserta una subparte despues de `subpart` directamente en `data_part`.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param subpart: info de la subpart donde se insertara
+    :param data_subpart: data de la subpart a importar (vertices)
+    :param inf_subpart: info de la subpart a importar (se escribe su offset)
+    :return: tupla (cant a sumar, offset final de la subparte insertada)
+    """
     # offset de la subparte
     offset = subpart.sub_part_offset
     size = calc_subpart_size(subpart.num_vertices, subpart.num_bones)
@@ -85,15 +117,16 @@ def insert_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry, data_subp
     num_parts, = struct.unpack_from("<I", data_part, 0)
 
     # sumar el 0x10 incialmente a los offsets de las subpartes
-    for i in range(1, num_parts + 1):
-        offset_old, = struct.unpack_from("<I", data_part, 0x10 * i)
-        offset_old+=0x10
-        struct.pack_into("<I", data_part, 0x10 * i, offset_old)
+    shift_subpart_offsets(data_part, 0, num_parts, 0x10)
 
-    # escribir offset donde empiece la subparte
+    # insertar los vertices de la subparte (antes que el header, para que el
+    # offset no dependa del header insertado)
+    size_new = len(data_subpart)
     offser_insert = offset + size + 0x10
+    data_part[offset + size:offset + size] = data_subpart
+
+    # escribir offset donde empiece la subparte e insertar la informacion
     struct.pack_into("<I", inf_subpart, 0xc, offser_insert)
-    # insertar la informacion
     pos = 4 + (0x10 * num_subpart)
     data_part[pos:pos] = inf_subpart
 
@@ -101,38 +134,195 @@ def insert_sub_part(blob: dict, part: int, subpart: SubPartIndexEntry, data_subp
     num_parts+=1
     struct.pack_into("<I", data_part, 0, num_parts)
 
-    # insertar los vertices de la subparte
-    size_new = len(data_subpart)
-    # data_part.insert(offser_insert, data_subpart)
-    data_part[offser_insert:offser_insert] = data_subpart
-
     # arreglar offsets de las subpartes
-    for i in range(num_subpart + 2, num_parts + 1):
-        offset_old, = struct.unpack_from("<I", data_part, 0x10 * i)
-        offset_old+=size_new
-        struct.pack_into("<I", data_part, 0x10 * i, offset_old)
+    shift_subpart_offsets(data_part, num_subpart + 1, num_parts, size_new)
 
-    # cantidad a sumar
-    res_cant = size_new
-    return data_part, res_cant, offser_insert - 0x10
+    return size_new, offser_insert
+
+def insert_sub_parts(blob: PartStore, part: int, subpart: SubPartIndexEntry,
+                     subparts: Sequence[tuple[bytearray, bytearray]]) -> tuple[bytearray, int]:
+    """
+    inserta varias subpartes seguidas en la memoria, en una sola pasada
+    :param blob: partes del documento
+    :param part: parte donde esta ubicada la subpart
+    :param subpart: info de la subpart despues de la cual se insertaran
+    :param subparts: tuplas (info de la subpart, data de la subpart), en orden
+
+    :return: tupla (parte actualizada, bytes de vertices agregados)
+    """
+    data_part = blob.copy(part)
+
+    if not data_part:
+        raise ValueError("la parte no existe en memoria")
+
+    cant = insert_sub_parts_in(data_part, subpart, subparts)
+
+    return data_part, cant
+
+def insert_sub_parts_in(data_part: bytearray, subpart: SubPartIndexEntry,
+                        subparts: Sequence[tuple[bytearray, bytearray]]) -> int:
+    """
+    Inserta varias subpartes despues de `subpart` directamente en `data_part`.
+
+    Los headers nuevos y los vertices nuevos se insertan cada uno como un solo
+    bloque, de modo que la cola de la parte se mueve dos veces sin importar
+    cuantas subpartes se inserten.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param subpart: info de la subpart despues de la cual se insertaran
+    :param subparts: tuplas (info de la subpart, data de la subpart), en orden
+    :return: bytes de vertices agregados
+    """
+    count = len(subparts)
+    if count == 0:
+        return 0
+
+    offset = subpart.sub_part_offset + calc_subpart_size(subpart.num_vertices, subpart.num_bones)
+    num_subpart = subpart.sub_part + 1
+    num_parts, = struct.unpack_from("<I", data_part, 0)
+
+    headers = bytearray().join(inf[:0x10] for inf, _ in subparts)
+    vertices = bytearray().join(data for _, data in subparts)
+    sizes = np.fromiter((len(data) for _, data in subparts), dtype=np.uint32, count=count)
+
+    # offsets de las subpartes existentes: todas se corren por los headers
+    # nuevos y las siguientes a la insercion tambien por los vertices nuevos
+    shift_subpart_offsets(data_part, 0, num_parts, 0x10 * count)
+    shift_subpart_offsets(data_part, num_subpart, num_parts, len(vertices))
+
+    # offsets de las subpartes nuevas
+    new_offsets = np.ndarray(shape=(count,), dtype="<u4", buffer=headers, offset=0xC, strides=(0x10,))
+    new_offsets[:] = offset + 0x10 * count + np.cumsum(sizes) - sizes
+    del new_offsets
+
+    # insertar los vertices y luego los headers
+    data_part[offset:offset] = vertices
+    pos = 4 + (0x10 * num_subpart)
+    data_part[pos:pos] = headers
+
+    # actualiza la cantidad de subparts en la parte
+    struct.pack_into("<I", data_part, 0, num_parts + count)
+
+    return len(vertices)
+
+def check_subpart(inf_subpart: bytes, data_subpart: bytes, name: str = "subparte"):
+    """
+    Valida el header de una subparte contra sus vertices.
 
-def delete_sub_part(blob: dict, part:int, subpart: SubPartIndexEntry) -> tuple[bytearray, int]:
+    :param inf_subpart: info de la subpart (0x10 bytes)
+    :param data_subpart: data de la subpart (vertices)
+    :param name: nombre de la subparte para el mensaje de error
+    """
+    if len(inf_subpart) < 0x10:
+        raise ValueError(f"El header de \"{name}\" esta incompleto")
+
+    num_vertices, num_bones, _, _ = read_subpart_header(inf_subpart)
+    if not 1 <= num_bones <= 4:
+        raise ValueError(f"\"{name}\" tiene una cantidad de huesos invalida ({num_bones})")
+
+    size = calc_subpart_size(num_vertices, num_bones)
+    if size == 0 or len(data_subpart) != size:
+        raise ValueError(
+            f"El tamaño de \"{name}\" ({len(data_subpart)} bytes) no coincide con su header "
+            f"({num_vertices} vertices, {num_bones} huesos: {size} bytes)"
+        )
+
+def trim_sub_parts(data_part: bytearray):
+    """
+    Quita los residuos despues de la ultima subparte y alinea la parte a 16.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    """
+    num_subparts, = struct.unpack_from("<I", data_part, 0)
+    if num_subparts:
+        pos = 4 + 0x10 * (num_subparts - 1)
+        num_vertices, num_bones, _, _ = read_subpart_header(data_part, pos)
+        offset, = struct.unpack_from("<I", data_part, pos + 0xC)
+        end = offset + calc_subpart_size(num_vertices, num_bones)
+    else:
+        end = 4
+    del data_part[end:]
+    align_16(data_part)
+
+def delete_sub_part(blob: PartStore, part:int, subpart: SubPartIndexEntry) -> tuple[bytearray, int]:
     """
     Elimina una subparte de la memoria
-    :param blob: blob de la part
+    :param blob: partes del documento
     :param part: parte donde se eliminara
     :param subpart: info de la subpart que se eliminara
 
     :return: data_part, tamaño de la subparte eliminada
     """
-    data_part = blob.get(f"{part}", None)
-    # print(len(data_part))
+    data_part = blob.copy(part)
 
     if not data_part:
         raise ValueError("la parte no existe en memoria")
 
-    data_part = bytearray(data_part)
+    size = delete_sub_part_in(data_part, subpart)
+
+    return data_part, size
+
+def delete_sub_parts(blob: PartStore, part: int, indices: Sequence[int]) -> tuple[bytearray, int]:
+    """
+    Elimina varias subpartes de una parte en una sola pasada.
 
+    La parte nueva se construye de una vez a partir de la actual: los headers
+    de las subpartes conservadas (con sus offsets recalculados en bloque) y los
+    bytes de vertices sin los rangos de las subpartes eliminadas.
+
+    :param blob: partes del documento
+    :param part: parte donde se eliminaran
+    :param indices: subpartes a eliminar
+    :return: tupla (parte actualizada, bytes de vertices eliminados)
+    """
+    with blob.view(part) as data_part:
+        if not data_part:
+            raise ValueError("la parte no existe en memoria")
+
+        table = SubPartTable.from_buffer(data_part)
+        num_subparts = len(table)
+
+        drop = np.zeros(num_subparts, dtype=bool)
+        indices = np.asarray(sorted(set(indices)), dtype=np.int64)
+        if len(indices) == 0:
+            raise ValueError("No hay subpartes seleccionadas.")
+        if indices[0] < 0 or indices[-1] >= num_subparts:
+            raise ValueError("Índice de subparte inválido.")
+        drop[indices] = True
+
+        offsets = table.offsets.astype(np.int64)
+        sizes = (2 * table.records['num_bones'].astype(np.int64) + 8) * table.records['num_vertices']
+        removed = np.where(drop, sizes, 0)
+
+        # offsets de las conservadas: sin los headers eliminados ni los vertices
+        # de las subpartes eliminadas anteriores
+        keep = ~drop
+        before = np.cumsum(removed) - removed
+        new_offsets = offsets[keep] - 0x10 * len(indices) - before[keep]
+
+        headers = np.frombuffer(data_part, dtype=np.uint8, count=0x10 * num_subparts, offset=4)
+        kept = headers.reshape(num_subparts, 0x10)[keep]
+        kept.view("<u4")[:, 3] = new_offsets
+        del headers
+
+        # bytes de vertices, saltando los rangos eliminados
+        pos = 4 + 0x10 * num_subparts
+        chunks = [struct.pack("<I", len(kept)), kept.tobytes()]
+        for start, size in zip(offsets[drop].tolist(), sizes[drop].tolist()):
+            chunks.append(data_part[pos:start])
+            pos = start + size
+        chunks.append(data_part[pos:])
+
+        return bytearray().join(chunks), int(removed.sum())
+
+def delete_sub_part_in(data_part: bytearray, subpart: SubPartIndexEntry) -> int:
+    """
+    Elimina una subparte directamente en `data_part`.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param subpart: info de la subpart que se eliminara
+    :return: tamaño de la subparte eliminada
+    """
     offset = subpart.sub_part_offset
     size = calc_subpart_size(subpart.num_vertices, subpart.num_bones)
 
@@ -143,22 +333,65 @@ def delete_sub_part(blob: dict, part:int, subpart: SubPartIndexEntry) -> tuple[b
 
     num_subparts, = struct.unpack_from("<I", data_part, 0)
     # arreglar offsets
-    for i in range(1, num_subparts):
-        offset_old, = struct.unpack_from("<I", data_part, 0x10 * i)
-        offset_old -= 0x10
-        struct.pack_into("<I", data_part, 0x10 * i, offset_old)
-
-    for i in range(subpart.sub_part + 1, num_subparts):
-        offset_old, = struct.unpack_from("<I", data_part, 0x10 * i)
-        offset_old -= size
-        struct.pack_into("<I", data_part, 0x10 * i, offset_old)
-
+    shift_subpart_offsets(data_part, 0, num_subparts - 1, -0x10)
+    shift_subpart_offsets(data_part, subpart.sub_part, num_subparts - 1, -size)
 
     # actualiza la cantidad de subparts en la parte
     num_subparts -= 1
     struct.pack_into("<I", data_part, 0, num_subparts)
 
-    return data_part, size
+    return size
+
+def transform_sub_parts(blob: PartStore, part: int, matrix, offset=(0.0, 0.0, 0.0), indices=None) -> bytearray:
+    """
+    Transforma las posiciones de los vertices de subpartes de una parte
+    :param blob: partes del documento
+    :param part: parte donde estan las subpartes
+    :param matrix: matriz 3x3 de escala/espejo (ver `transform_matrix`)
+    :param offset: traslacion en x, y, z
+    :param indices: subpartes a transformar (todas si es None)
+    :return: parte actualizada
+    """
+    data_part = blob.copy(part)
+
+    if not data_part:
+        raise ValueError("la parte no existe en memoria")
+
+    table = SubPartTable.from_buffer(data_part)
+    if indices is not None and any(not 0 <= i < len(table) for i in indices):
+        raise ValueError("Índice de subparte inválido.")
+
+    transform_positions(data_part, table, matrix, offset, indices)
+
+    return data_part
+
+def shift_subpart_offsets(data_part: bytearray, first: int, stop: int, delta: int):
+    """
+    Suma `delta` al offset de las subpartes [first, stop) de una parte.
+
+    Los offsets se modifican directamente en los headers de la parte con una
+    sola operación vectorizada sobre una vista de paso 0x10.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param first: primera subparte a desplazar
+    :param stop: subparte final (no incluida)
+    :param delta: cantidad a sumar (puede ser negativa)
+    """
+    if delta == 0 or stop <= first:
+        return
+
+    offsets = np.ndarray(
+        shape=(stop - first,),
+        dtype="<u4",
+        buffer=data_part,
+        offset=4 + 0x10 * first + 0xC,
+        strides=(0x10,)
+    )
+    if delta > 0:
+        offsets += np.uint32(delta)
+    else:
+        offsets -= np.uint32(-delta)
+    del offsets
 
 def calc_subpart_size(num_vertices: int, num_bones: int, vertex = False) -> int:
     """
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from app.core.document import PmdlDocument
+from app.core.operations import replace_part
+from app.logic_sub_parts_pmdl.sub_parts_index import parse_subparts_index, SubPartTable
+
+
+class PartStore:
+    """
+    Partes de un PMDL vistas desde el editor de subpartes.
+
+    El documento es la única fuente de verdad: leer una parte da una vista
+    sobre los bytes del documento (sin copia) que vale solo dentro de un
+    bloque `with`, y guardar una parte editada la reemplaza en el documento,
+    que pasa a ser su único dueño. Las claves son los índices enteros de las
+    partes.
+    """
+
+    def __init__(self, doc: PmdlDocument):
+        self.doc = doc
+
+    def __len__(self) -> int:
+        return len(self.doc.parts)
+
+    def __contains__(self, part: int) -> bool:
+        return 0 <= part < len(self.doc.parts)
+
+    @contextmanager
+    def view(self, part: int) -> Iterator[memoryview]:
+        """
+        Vista de solo lectura de los bytes de la parte, liberada al salir del
+        bloque `with`.
+
+        Raises:
+            ValueError: Si la parte no existe.
+        """
+        if part not in self:
+            raise ValueError("la parte no existe en memoria")
+        view = memoryview(self.doc.part_data(part)).toreadonly()
+        try:
+            yield view
+        finally:
+            view.release()
+
+    def copy(self, part: int) -> bytearray:
+        """Copia editable de los bytes de la parte."""
+        with self.view(part) as data:
+            return bytearray(data)
+
+    def commit(self, part: int, data_part: bytearray):
+        """Reemplaza la parte en el documento con los bytes editados."""
+        replace_part(self.doc, data_part, part)
+
+
+class SubPartsCache:
+    """
+    Índices de subpartes de las partes de un `PartStore`, parseados a demanda.
+
+    Cada parte se parsea la primera vez que se consulta y se guarda junto con
+    la versión de sus bytes en el documento; si la parte cambió desde entonces
+    (edición, deshacer, partes agregadas o borradas) se vuelve a parsear.
+    """
+
+    def __init__(self, store: PartStore):
+        self.store = store
+        self._entries: Dict[int, Tuple[int, SubPartTable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, part: int) -> SubPartTable:
+        version = self.store.doc.part_version(part)
+        cached = self._entries.get(part)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self.store.view(part) as data_part:
+            entries = parse_subparts_index(data_part)
+        self._entries[part] = (version, entries)
+        return entries
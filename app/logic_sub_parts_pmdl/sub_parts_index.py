@@ -1,42 +1,175 @@
 import struct
-from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+SUBPART_HEADER_STRIDE = 0x10
+
+# Layout de un header de subparte dentro de la parte (0x10 bytes). Los bytes
+# 1 y 3 no se interpretan.
+SUBPART_HEADER_DTYPE = np.dtype({
+    'names': ['num_vertices', 'num_bones', 'id_bones', 'unk', 'sub_part_offset'],
+    'formats': ['u1', 'u1', ('u1', (4,)), '<u4', '<u4'],
+    'offsets': [0, 2, 4, 8, 0xC],
+    'itemsize': SUBPART_HEADER_STRIDE,
+})
+
+# Fila del índice en memoria
+SUBPART_DTYPE = np.dtype([
+    ('sub_part_offset', '<u4'),
+    ('unk', '<u4'),
+    ('num_vertices', '<u2'),
+    ('num_bones', '<u2'),
+    ('id_bones', 'u1', (4,)),
+])
+
+
+def read_subpart_header(buffer, offset: int = 0) -> Tuple[int, int, List[int], int]:
+    """
+    Lee un header de subparte (`SUBPART_HEADER_DTYPE`) de `buffer`.
+
+    Es el mismo layout que usa el índice de subpartes: las cantidades de
+    vértices y huesos son u8 en los bytes 0 y 2.
+
+    :return: (num_vertices, num_bones, id_bones, unk)
+    """
+    header = np.frombuffer(buffer, dtype=SUBPART_HEADER_DTYPE, count=1, offset=offset)[0]
+    return (int(header['num_vertices']), int(header['num_bones']),
+            header['id_bones'].tolist(), int(header['unk']))
+
+
+def _column(name: str) -> property:
+    """Crea una propiedad que lee/escribe una columna de la tabla para una fila."""
+    def fget(self) -> int:
+        return int(self._table.records[name][self._index])
+
+    def fset(self, value: int):
+        self._table.records[name][self._index] = value
+
+    return property(fget, fset)
 
 
-@dataclass
 class SubPartIndexEntry:
-    """Entrada del índice de subpartes."""
-    sub_part: int
-    sub_part_offset: int
-    num_vertices: int
-    num_bones: int
-    id_bones: list[int]
-    unk: int
-
-def parse_subparts_index(blob_subpart: bytes) -> List[SubPartIndexEntry]:
-    entries: List[SubPartIndexEntry] = []
-    offset = 4
-    chunk_size = 0x10
-    num_subparts, = struct.unpack_from("<I", blob_subpart, 0)
-
-    for i in range(num_subparts):
-        chunk = blob_subpart[offset:offset + chunk_size]
-
-        if len(chunk) < chunk_size:
-            raise ValueError(f"Índice de subpartes incompleto en entrada {i}, offset {offset}.")
-
-        offset += chunk_size
-
-        sub_part = i
-        num_vertices, = struct.unpack_from("<B", chunk, 0)
-        num_bones, = struct.unpack_from("<B", chunk, 2)
-        id_bones:list[int] = []
-
-        for bone in range(4,8):
-            id_bone, = struct.unpack_from("<B", chunk, bone)
-            id_bones.append(id_bone)
-        unk, = struct.unpack_from("<I", chunk, 8)
-        sub_part_offset, = struct.unpack_from("<I", chunk, 0xc)
-
-        entries.append(SubPartIndexEntry(sub_part, sub_part_offset, num_vertices, num_bones, id_bones, unk))
-    return entries
\ No newline at end of file
+    """Entrada del índice de subpartes (vista de una fila de `SubPartTable`)."""
+    __slots__ = ('_table', '_index')
+
+    sub_part_offset = _column('sub_part_offset')
+    num_vertices = _column('num_vertices')
+    num_bones = _column('num_bones')
+    unk = _column('unk')
+
+    def __init__(self, table: "SubPartTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def sub_part(self) -> int:
+        """Número de la subparte dentro de la parte (su fila)."""
+        return self._index
+
+    @property
+    def id_bones(self) -> List[int]:
+        return self._table.records['id_bones'][self._index].tolist()
+
+    @id_bones.setter
+    def id_bones(self, value: Sequence[int]):
+        self._table.records['id_bones'][self._index] = value
+
+
+class SubPartTable:
+    """
+    Índice de subpartes de una parte en formato columnar.
+
+    Los headers se decodifican de una vez con un dtype estructurado y cada fila
+    ocupa 0x10 bytes en un array de NumPy (`SUBPART_DTYPE`); las entradas
+    (`SubPartIndexEntry`) son vistas sobre ese array, sin objetos por fila.
+    """
+
+    def __init__(self, records: np.ndarray = None):
+        if records is None:
+            records = np.zeros(0, dtype=SUBPART_DTYPE)
+        self.records = records
+
+    @classmethod
+    def from_buffer(cls, blob_subpart) -> "SubPartTable":
+        """
+        Lee el índice de subpartes de los bytes de una parte.
+
+        La tabla de headers se interpreta con `np.frombuffer` y se copia a la
+        tabla, que no conserva referencias al buffer.
+        """
+        num_subparts, = struct.unpack_from("<I", blob_subpart, 0)
+        available = max(0, (len(blob_subpart) - 4) // SUBPART_HEADER_STRIDE)
+        if num_subparts > available:
+            offset = 4 + SUBPART_HEADER_STRIDE * available
+            raise ValueError(f"Índice de subpartes incompleto en entrada {available}, offset {offset}.")
+
+        view = np.frombuffer(blob_subpart, dtype=SUBPART_HEADER_DTYPE, count=num_subparts, offset=4)
+        records = np.zeros(num_subparts, dtype=SUBPART_DTYPE)
+        for name in SUBPART_DTYPE.names:
+            records[name] = view[name]
+        del view
+        return cls(records)
+
+    # ----- Acceso tipo lista -----
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> SubPartIndexEntry:
+        n = len(self.records)
+        if index < 0:
+            index += n
+        if not (0 <= index < n):
+            raise IndexError("Índice de subparte fuera de rango.")
+        return SubPartIndexEntry(self, index)
+
+    def __iter__(self) -> Iterator[SubPartIndexEntry]:
+        for i in range(len(self.records)):
+            yield SubPartIndexEntry(self, i)
+
+    # ----- Columnas -----
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self.records['sub_part_offset']
+
+    @property
+    def bone_ids(self) -> np.ndarray:
+        """IDs de huesos de todas las subpartes, array (n, 4) de uint8."""
+        return self.records['id_bones']
+
+    def shift_offsets(self, delta: int, start: int = 0, stop: int = None):
+        """Suma `delta` a los offsets de las filas [start, stop)."""
+        if delta == 0:
+            return
+        column = self.records['sub_part_offset'][start:stop]
+        if delta > 0:
+            column += np.uint32(delta)
+        else:
+            column -= np.uint32(-delta)
+
+    # ----- Altas / bajas -----
+
+    def insert(self, index: int, sub_part_offset: int, num_vertices: int, num_bones: int,
+               id_bones: Sequence[int], unk: int):
+        """Inserta una fila para que quede en `index`."""
+        row = np.zeros(1, dtype=SUBPART_DTYPE)
+        row['sub_part_offset'] = sub_part_offset
+        row['num_vertices'] = num_vertices
+        row['num_bones'] = num_bones
+        row['id_bones'] = id_bones
+        row['unk'] = unk
+        self.records = np.insert(self.records, index, row)
+
+    def delete(self, indices: Union[int, Sequence[int]]):
+        """Elimina una o varias filas."""
+        self.records = np.delete(self.records, indices)
+
+    def __delitem__(self, index: int):
+        self.delete(index)
+
+
+def parse_subparts_index(blob_subpart: bytes) -> SubPartTable:
+    return SubPartTable.from_buffer(blob_subpart)
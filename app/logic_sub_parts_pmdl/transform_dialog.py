@@ -0,0 +1,75 @@
+import math
+from tkinter import messagebox
+
+import customtkinter as ctk
+
+
+class TransformDialog(ctk.CTkToplevel):
+    """
+    Ventana para pedir escala, traslación y espejo por eje.
+
+    `get_values()` espera a que se cierre la ventana y devuelve la tupla
+    (escala, traslación, ejes de espejo) o None si se canceló.
+    """
+
+    def __init__(self, master, title="Transformar"):
+        super().__init__(master)
+
+        self.title(title)
+        self.resizable(False, False)
+        self.transient(master.winfo_toplevel())
+
+        self._result = None
+
+        frame = ctk.CTkFrame(self, fg_color="#2B2B2B", corner_radius=10)
+        frame.pack(padx=15, pady=15)
+
+        for col, axis in enumerate("XYZ", start=1):
+            ctk.CTkLabel(frame, text=axis, font=("Segoe UI", 13, "bold")).grid(row=0, column=col, pady=(8, 4))
+
+        self.entry_scale = self._entry_row(frame, 1, "Escala:", "1")
+        self.entry_offset = self._entry_row(frame, 2, "Traslación:", "0")
+
+        ctk.CTkLabel(frame, text="Espejo:", font=("Segoe UI", 13)).grid(row=3, column=0, sticky="w", padx=10, pady=8)
+        self.mirror_vars = []
+        for col in range(3):
+            var = ctk.BooleanVar(value=False)
+            ctk.CTkCheckBox(frame, text="", variable=var, width=24).grid(row=3, column=col + 1, padx=(22, 0))
+            self.mirror_vars.append(var)
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(pady=(0, 15))
+        ctk.CTkButton(buttons, text="Aplicar", width=100, command=self._on_apply).pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Cancelar", width=100, command=self.destroy).pack(side="left", padx=5)
+
+        self.grab_set()
+
+    def _entry_row(self, frame, row, label, default):
+        ctk.CTkLabel(frame, text=label, font=("Segoe UI", 13)).grid(row=row, column=0, sticky="w", padx=10, pady=4)
+        entries = []
+        for col in range(3):
+            entry = ctk.CTkEntry(frame, width=60, justify="center")
+            entry.insert(0, default)
+            entry.grid(row=row, column=col + 1, padx=3, pady=4)
+            entries.append(entry)
+        return entries
+
+    def _on_apply(self):
+        try:
+            scale = tuple(float(e.get()) for e in self.entry_scale)
+            offset = tuple(float(e.get()) for e in self.entry_offset)
+        except ValueError:
+            messagebox.showerror("Error", "Los valores de escala y traslación deben ser números.", parent=self)
+            return
+
+        if not all(math.isfinite(v) for v in scale + offset):
+            messagebox.showerror("Error", "Los valores de escala y traslación deben ser finitos.", parent=self)
+            return
+
+        mirror = "".join(axis for axis, var in zip("xyz", self.mirror_vars) if var.get())
+        self._result = (scale, offset, mirror)
+        self.destroy()
+
+    def get_values(self):
+        self.wait_window()
+        return self._result
@@ -1,17 +1,19 @@
-import copy
 import os
 import re
 import struct
+import sys
 import tkinter as tk
 from pathlib import Path
+from typing import Optional
 from tkinter import filedialog, messagebox
 
 import customtkinter as ctk
-from app.core.operations import export_part, replace_part
+from app.logic_sub_parts_pmdl.part_store import PartStore, SubPartsCache
 from app.logic_sub_parts_pmdl.scrollable_option_menu import ScrollableOptionMenu
-from app.logic_sub_parts_pmdl.sub_parts_index import parse_subparts_index, SubPartIndexEntry
-from app.logic_sub_parts_pmdl.operations import calc_subpart_size, export_sub_part, import_sub_part, align_16, \
-    insert_sub_part, delete_sub_part
+from app.logic_sub_parts_pmdl.operations import calc_subpart_size, export_sub_part, import_sub_part, \
+    delete_sub_parts, insert_sub_parts, check_subpart, trim_sub_parts, transform_sub_parts
+from app.logic_sub_parts_pmdl.transform_dialog import TransformDialog
+from app.logic_sub_parts_pmdl.vertices import transform_matrix
 
 APP_TITLE = "Pmdl Editor - SubParts"
 UI_FONT = ("Segoe UI", 12)
@@ -19,7 +21,32 @@ GRID_FONT = ("Consolas", 15)
 SEL_COLOR = "#1F538D"
 BG_COLOR = "#333333"
 
+GRID_ROW_HEIGHT = 28    # Alto de una fila de la grilla
+GRID_HEADER_HEIGHT = 30 # Alto de los encabezados
+GRID_WHEEL_ROWS = 3     # Filas por paso de la rueda del mouse
+
+
+class _GridRow:
+    """Fila reutilizable de la grilla: celdas ligadas a una subparte."""
+
+    def __init__(self, row: int):
+        self.row = row          # fila de la grilla
+        self.index = -1         # subparte mostrada (-1 = ninguna)
+        self.color = BG_COLOR
+        self.cells: list[ctk.CTkEntry] = []
+        self.values: list[tk.StringVar] = []
+
+
 class MultiSelectTable(ctk.CTkFrame):
+    """
+    Grilla de subpartes virtualizada.
+
+    Solo existen las celdas de las filas visibles: al desplazarse o cambiar de
+    parte, las mismas filas se vuelven a ligar a otras subpartes del índice
+    (`SubPartTable`), que es la fuente de verdad. La selección se guarda por
+    número de subparte, no en los widgets.
+    """
+
     def __init__(self, master, rows=0, cols=5, headers=None,
                  parent_app=None, path=0, **kwargs):
         super().__init__(master, fg_color="transparent", **kwargs)
@@ -30,9 +57,16 @@ class MultiSelectTable(ctk.CTkFrame):
 
         self.rows_count = rows
         self.cols_count = cols
-        self.cells: list[list[ctk.CTkEntry]] = []
         self.selected_rows: set[int] = set()
 
+        # índice mostrado: caché de subpartes y parte actual
+        self._subparts: Optional[SubPartsCache] = None
+        self._part = 0
+
+        self._rows: list[_GridRow] = []
+        self._first = 0
+        self._visible = 1
+
         self._build_scroll()
         self._build_headers(headers)
 
@@ -40,14 +74,28 @@ class MultiSelectTable(ctk.CTkFrame):
     # UI
     # =========================
     def _build_scroll(self):
-        self.scroll = ctk.CTkScrollableFrame(
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.scroll = ctk.CTkFrame(
             self,
             fg_color="#2B2B2B",
             corner_radius=0,
             border_width=1,
             border_color="#444444"
         )
-        self.scroll.pack(fill="both", expand=True)
+        self.scroll.grid(row=0, column=0, sticky="nsew")
+
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=0, column=1, sticky="ns")
+        self._scrollbar.set(0.0, 1.0)
+
+        self.scroll.bind("<Configure>", self._on_configure)
+        # La ventana recibe la rueda de todos sus widgets y se destruye con ellos
+        top = self.winfo_toplevel()
+        top.bind("<MouseWheel>", self._on_mouse_wheel, add="+")
+        top.bind("<Button-4>", self._on_mouse_wheel, add="+")
+        top.bind("<Button-5>", self._on_mouse_wheel, add="+")
 
     def _build_headers(self, headers):
         if not headers:
@@ -67,12 +115,11 @@ class MultiSelectTable(ctk.CTkFrame):
     # =========================
     # HELPERS
     # =========================
-    def _get_blob(self):
-        # return self.parent_app._blob if self.path == 0 else self.parent_app._blob2
-        return self.master.master._blobs if self.path == 0 else self.master.master._blobs2
+    def _get_blob(self) -> PartStore:
+        return self.master.master._store if self.path == 0 else self.master.master._store2
 
     def _get_parts(self):
-        return self.parent_app._parts if self.path == 0 else self.parent_app._parts2
+        return self.parent_app._doc.parts if self.path == 0 else self.parent_app._doc2.parts
 
     def _get_subparts(self):
         return (
@@ -81,6 +128,27 @@ class MultiSelectTable(ctk.CTkFrame):
             else self.master.master._sub_parts2
         )
 
+    def _get_table(self):
+        """Índice de subpartes de la parte mostrada (None si no hay)."""
+        if self._subparts is None:
+            return None
+        return self._subparts[self._part]
+
+    def _count(self) -> int:
+        table = self._get_table()
+        return len(table) if table is not None else 0
+
+    def _row_values(self, table, index: int) -> list[int]:
+        e = table[index]
+        return [
+            e.sub_part,
+            e.sub_part_offset,
+            e.num_vertices,
+            e.num_bones,
+            calc_subpart_size(e.num_vertices, e.num_bones),
+            e.unk
+        ]
+
     def get_selected_row_indices(self) -> list[int]:
         """
         Devuelve una lista ordenada de filas seleccionadas.
@@ -96,86 +164,159 @@ class MultiSelectTable(ctk.CTkFrame):
     # TABLE CONTROL
     # =========================
     def clear(self):
-        for row in self.cells:
-            for cell in row:
-                cell.destroy()
-
-        self.cells.clear()
+        self._subparts = None
+        self._part = 0
         self.selected_rows.clear()
         self.rows_count = 0
-
-        try:
-            self.scroll._parent_canvas.yview_moveto(0)
-        except AttributeError:
-            pass
+        self._first = 0
+        self._refresh()
 
     def set_table(self, rows=0, subpart=None, part=0):
-        self.clear()
+        """Liga la grilla al índice de subpartes de `part` y selecciona la primera."""
+        self._subparts = subpart
+        self._part = part
         self.rows_count = rows
+        self.selected_rows = set()
+        self._first = 0
+        self._refresh()
 
-        data = subpart[part]
-        rows_data = [
-            [
-                e.sub_part,
-                e.sub_part_offset,
-                e.num_vertices,
-                e.num_bones,
-                calc_subpart_size(e.num_vertices, e.num_bones),
-                e.unk
-            ]
-            for e in data
-        ]
+        if self.rows_count:
+            self.select_row(0)
 
-        for r, row_data in enumerate(rows_data):
-            widgets = []
-            for c in range(self.cols_count):
-                entry = self._create_cell(r, c, row_data[c])
-                widgets.append(entry)
-            self.cells.append(widgets)
+    def _create_row(self, row: int) -> _GridRow:
+        grid_row = _GridRow(row)
+        for col in range(self.cols_count):
+            value = tk.StringVar(self)
+            entry = ctk.CTkEntry(
+                self.scroll,
+                width=75,
+                height=28,
+                font=GRID_FONT,
+                justify="center",
+                corner_radius=0,
+                border_width=1,
+                fg_color=BG_COLOR,
+                border_color="#444444",
+                textvariable=value,
+                state="readonly"
+            )
+            entry.grid(row=row, column=col, sticky="nsew")
+            entry.grid_remove()
+
+            entry.bind("<Button-1>", lambda e, r=grid_row: self._handle_click(e, r.index))
+            entry.bind("<Button-3>", self._open_context_menu)
+            grid_row.cells.append(entry)
+            grid_row.values.append(value)
+        return grid_row
+
+    def _bind_row(self, grid_row: _GridRow, table, index: int):
+        for value, v in zip(grid_row.values, self._row_values(table, index)):
+            value.set(f"{v:02}")
+
+    def _paint_row(self, grid_row: _GridRow):
+        color = SEL_COLOR if grid_row.index in self.selected_rows else BG_COLOR
+        if color != grid_row.color:
+            for cell in grid_row.cells:
+                cell.configure(fg_color=color)
+            grid_row.color = color
+
+    def _refresh(self):
+        """Liga las filas visibles a sus subpartes y oculta las sobrantes."""
+        table = self._get_table()
+        count = len(table) if table is not None else 0
+
+        while len(self._rows) < min(self._visible, count):
+            self._rows.append(self._create_row(len(self._rows) + 1))
+
+        for k, grid_row in enumerate(self._rows):
+            index = self._first + k
+            if k < self._visible and index < count:
+                self._bind_row(grid_row, table, index)
+                if grid_row.index < 0:
+                    for cell in grid_row.cells:
+                        cell.grid()
+                grid_row.index = index
+                self._paint_row(grid_row)
+            elif grid_row.index >= 0:
+                grid_row.index = -1
+                for cell in grid_row.cells:
+                    cell.grid_remove()
+
+        self._update_scrollbar()
 
-        if self.cells:
-            self.select_row(0)
+    # =========================
+    # SCROLL
+    # =========================
+    def _max_first(self) -> int:
+        return max(0, self._count() - self._visible)
 
-    def _create_cell(self, row, col, value):
-        entry = ctk.CTkEntry(
-            self.scroll,
-            width=75,
-            height=28,
-            font=GRID_FONT,
-            justify="center",
-            corner_radius=0,
-            border_width=1,
-            fg_color=BG_COLOR,
-            border_color="#444444"
-        )
+    def _scroll_to(self, first: int):
+        first = max(0, min(self._max_first(), first))
+        if first == self._first:
+            return
+        self._first = first
+        self._refresh()
 
-        entry.insert(0, f"{value:02}")
-        entry.configure(state="readonly")
-        entry.grid(row=row + 1, column=col, sticky="nsew")
+    def _update_scrollbar(self):
+        count = self._count()
+        if count <= self._visible:
+            self._scrollbar.set(0.0, 1.0)
+        else:
+            self._scrollbar.set(self._first / count, (self._first + self._visible) / count)
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - GRID_HEADER_HEIGHT) // GRID_ROW_HEIGHT)
+        if visible != self._visible:
+            self._visible = visible
+            self._first = min(self._first, self._max_first())
+            self._refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * self._count()))
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self._scroll_to(self._first + int(args[1]) * step)
+
+    def _on_mouse_wheel(self, event):
+        if not self._contains(event.widget):
+            return
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        elif sys.platform == "darwin":
+            steps = -event.delta
+        else:
+            steps = -int(event.delta / 120)
+        self._scroll_to(self._first + steps * GRID_WHEEL_ROWS)
 
-        entry.bind("<Button-1>", lambda e, r=row: self._handle_click(e, r))
-        entry.bind("<Button-3>", self._open_context_menu)
-        return entry
+    def _contains(self, widget) -> bool:
+        """Indica si `widget` está dentro de la grilla."""
+        while widget is not None:
+            if widget is self:
+                return True
+            widget = getattr(widget, "master", None)
+        return False
 
     # =========================
     # SELECTION
     # =========================
     def select_row(self, row_idx: int, scroll_to=True):
-        if row_idx < 0 or row_idx >= len(self.cells):
+        if row_idx < 0 or row_idx >= self._count():
             return
 
         self.selected_rows = {row_idx}
-        self._update_visuals()
 
-        if scroll_to:
-            try:
-                self.scroll._parent_canvas.yview_moveto(
-                    row_idx / max(1, self.rows_count)
-                )
-            except Exception:
-                pass
+        if scroll_to and not (self._first <= row_idx < self._first + self._visible):
+            self._scroll_to(row_idx)
+
+        self._update_visuals()
 
     def _handle_click(self, event, row_idx):
+        if row_idx < 0:
+            return
+
         ctrl = (event.state & 0x0004) != 0
 
         if not ctrl:
@@ -186,16 +327,18 @@ class MultiSelectTable(ctk.CTkFrame):
         self._update_visuals()
 
     def _update_visuals(self):
-        for r, row in enumerate(self.cells):
-            color = SEL_COLOR if r in self.selected_rows else BG_COLOR
-            for cell in row:
-                cell.configure(fg_color=color)
+        for grid_row in self._rows:
+            if grid_row.index >= 0:
+                self._paint_row(grid_row)
 
         self._change_labels()
 
     def get_selected_data(self):
+        table = self._get_table()
+        if table is None:
+            return []
         return [
-            [cell.get() for cell in self.cells[r]]
+            [f"{v:02}" for v in self._row_values(table, r)[:self.cols_count]]
             for r in sorted(self.selected_rows)
         ]
 
@@ -223,6 +366,10 @@ class MultiSelectTable(ctk.CTkFrame):
             menu.add_command(label="Importar Subpart", command=self._import_subparts)
             menu.add_command(label="Insertar Subpart", command=self._insert_subparts)
             menu.add_command(label="Delete Subpart", command=self._delete_subparts)
+            menu.add_separator()
+            menu.add_command(label="Transformar selecciones", command=self._transform_subparts)
+            menu.add_command(label="Transformar parte completa",
+                             command=lambda: self._transform_subparts(whole_part=True))
         else:
             menu.add_command(label="Agregar selecciones", command=self._add_subparts)
 
@@ -238,7 +385,7 @@ class MultiSelectTable(ctk.CTkFrame):
 
         try:
             base = os.path.splitext(
-                os.path.basename(self.parent_app._path if self.path == 0 else self.parent_app._path2)
+                os.path.basename(self.parent_app._doc.path if self.path == 0 else self.parent_app._doc2.path)
             )[0]
 
             messagebox.showinfo("Informacion", f"Se exportaran las siguientes subpartes\n{row_idx}\ndel pmdl: {base}")
@@ -265,20 +412,16 @@ class MultiSelectTable(ctk.CTkFrame):
                     return
 
                 subpart_dat = self._get_subparts()[part_idx][row_idx[0]]
-                # datos en bytes de la subparte
-                chunk = export_sub_part(
-                    self._get_blob(),
-                    part_idx,
-                    subpart_dat
-                )
                 dat = bytearray(b'\x00' * 0x10)
                 struct.pack_into("<H", dat, 0, subpart_dat.num_vertices)
                 struct.pack_into("<H", dat, 2, subpart_dat.num_bones)
                 struct.pack_into("<4B", dat, 4, *subpart_dat.id_bones)
                 struct.pack_into("<I", dat, 8, subpart_dat.unk)
-                chunk = dat + chunk
 
-                with open(out_path, "wb") as f:
+                # datos en bytes de la subparte
+                with export_sub_part(self._get_blob(), part_idx, subpart_dat) as chunk, \
+                        open(out_path, "wb") as f:
+                    f.write(dat)
                     f.write(chunk)
 
                 messagebox.showinfo("Exportado", f"SubParte {row_idx[0]:02} exportada")
@@ -299,20 +442,15 @@ class MultiSelectTable(ctk.CTkFrame):
                 filename = f"{base}_parte_{part_idx:02}_subparte_{i:02}.tttsubpart"
 
                 subpart_dat = self._get_subparts()[part_idx][i]
-                chunk = export_sub_part(
-                    self._get_blob(),
-                    part_idx,
-                    subpart_dat
-                )
-
                 dat = bytearray(b'\x00' * 0x10)
                 struct.pack_into("<H", dat, 0, subpart_dat.num_vertices)
                 struct.pack_into("<H", dat, 2, subpart_dat.num_bones)
                 struct.pack_into("<4B", dat, 4, *subpart_dat.id_bones)
                 struct.pack_into("<I", dat, 8, subpart_dat.unk)
-                chunk = dat + chunk
 
-                with open(Path(out_path, filename), "wb") as f:
+                with export_sub_part(self._get_blob(), part_idx, subpart_dat) as chunk, \
+                        open(Path(out_path, filename), "wb") as f:
+                    f.write(dat)
                     f.write(chunk)
 
             messagebox.showinfo("Exportado", f"SubPartes\n{row_idx}\nexportadas")
@@ -339,54 +477,24 @@ class MultiSelectTable(ctk.CTkFrame):
             return
 
         with open(path_subpart, "rb") as f:
-            chunk = f.read()
-            chunk =  bytearray(chunk)
-
-            # datos de la subparte
-            dat_chunk = chunk[:0x10]
-            chunk = chunk[0x10:]
-            chunk = bytearray(chunk)
+            raw = bytearray(f.read())
 
-        if len(chunk) == 0:
-            raise ValueError("La subpart importada esta vacia")
+        # ---- Leer y validar la subparte ----
+        dat_chunk = raw[:0x10]
+        chunk = raw[0x10:]
+        check_subpart(dat_chunk, chunk, os.path.basename(path_subpart))
 
-        # blob de las partes en bytes
+        # ---- Reemplazo binario (el header conserva su offset) ----
         blob = self._get_blob()
         part_dat = self._get_subparts()[part_idx][row_idx[0]]
-        data_part, cant = import_sub_part(
-            blob,
-            part_idx,
-            part_dat,
-            chunk
-        )
-        # actualizar offset de las subparts
-        parts = self._get_subparts()[part_idx]
-        for i in range(part_idx + 1, len(parts)):
-            parts[i].sub_part_offset+=cant
-
-        # actualizar valores de la subparte
-        num_vertices, = struct.unpack_from("<H", dat_chunk,0)
-        num_bones, = struct.unpack_from("<H", dat_chunk,2)
-        id_bones = list(struct.unpack_from("<4B", dat_chunk, 4))
-        unk, = struct.unpack_from("<I", dat_chunk, 8)
-
-        part_dat.num_vertices = num_vertices
-        part_dat.num_bones = num_bones
-        part_dat.id_bones = id_bones
-        part_dat.unk = unk
-
-        # obtener el tamaño de la subparte final
-        size_part_end = calc_subpart_size(parts[-1].num_vertices, parts[-1].num_bones)
+        data_part, _ = import_sub_part(blob, part_idx, part_dat, chunk, dat_chunk)
 
-        # quitar los residuos al final de la parte y alinear a 16
-        data_part = data_part[:parts[-1].sub_part_offset + size_part_end]
-        align_16(data_part)
+        # ---- Alinear y reemplazar parte completa en el modelo ----
+        trim_sub_parts(data_part)
+        blob.commit(part_idx, data_part)
 
-        # actualizar el blob dict
-        blob[f"{part_idx}"] = data_part
-
-        # añadir los cambios al modelo
-        replace_part(self.parent_app._blob, self.parent_app._hdr, self.parent_app._parts, data_part, part_idx)
+        # ---- Refrescar filas visibles (la selección se mantiene) ----
+        self._refresh()
 
         messagebox.showinfo("Importado", f"SubParte importada")
 
@@ -419,6 +527,8 @@ class MultiSelectTable(ctk.CTkFrame):
         if not paths_subpart:
             return
 
+        # ---- Leer y validar todas las subpartes ----
+        subparts = []
         for path_subpart in paths_subpart:
             with open(path_subpart, "rb") as f:
                 raw = f.read()
@@ -429,65 +539,17 @@ class MultiSelectTable(ctk.CTkFrame):
             dat_chunk = raw[:0x10]
             chunk = raw[0x10:]  # ya es bytearray por el slice
 
-            # ---- Header de la subparte ----
-            num_vertices, = struct.unpack_from("<H", dat_chunk, 0)
-            num_bones, = struct.unpack_from("<H", dat_chunk, 2)
-            id_bones = list(struct.unpack_from("<4B", dat_chunk, 4))
-            unk, = struct.unpack_from("<I", dat_chunk, 8)
-
-            # ---- Inserción binaria ----
-            blob = self._get_blob()
-            subparts_by_part = self._get_subparts()
-            part_dat = subparts_by_part[part_idx][insert_at]
-
-            data_part, cant, offset_insert = insert_sub_part(
-                blob,
-                part_idx,
-                part_dat,
-                chunk,
-                dat_chunk
-            )
-
-            # ---- Actualizar estructura de subpartes ----
-            sub_parts = subparts_by_part[part_idx]
-
-            new_entry = SubPartIndexEntry(
-                insert_at + 1,
-                offset_insert,
-                num_vertices,
-                num_bones,
-                id_bones,
-                unk
-            )
-            sub_parts.insert(insert_at + 1, new_entry)
-
-            # Reindexar IDs y ajustar offsets base (+0x10 del nuevo header)
-            for entry in sub_parts:
-                entry.sub_part = sub_parts.index(entry)
-                entry.sub_part_offset += 0x10
+            check_subpart(dat_chunk, chunk, os.path.basename(path_subpart))
+            subparts.append((dat_chunk, chunk))
 
-            # Ajustar offsets de los que están después del insert real en el blob
-            for i in range(insert_at + 2, len(sub_parts)):
-                sub_parts[i].sub_part_offset += cant
-
-
-            # ---- Alinear y actualizar blob ----
-            del data_part[sub_parts[-1].sub_part_offset + calc_subpart_size(sub_parts[-1].num_vertices, sub_parts[-1].num_bones):]
-            align_16(data_part)
-            blob[str(part_idx)] = data_part
-
-            # print(len(data_part))
-
-            # ---- Reemplazar parte completa en el modelo ----
-            replace_part(
-                self.parent_app._blob,
-                self.parent_app._hdr,
-                self.parent_app._parts,
-                data_part,
-                part_idx
-            )
+        # ---- Inserción binaria (todas a la vez) ----
+        blob = self._get_blob()
+        part_dat = self._get_subparts()[part_idx][insert_at]
+        data_part, _ = insert_sub_parts(blob, part_idx, part_dat, subparts)
 
-            insert_at+=1
+        # ---- Alinear y reemplazar parte completa en el modelo ----
+        trim_sub_parts(data_part)
+        blob.commit(part_idx, data_part)
 
         # ---- Refrescar tabla UI ----
         self.set_table(
@@ -517,7 +579,7 @@ class MultiSelectTable(ctk.CTkFrame):
 
         # datos del pmdl 1
         subparts_by_part =  self.master.master._sub_parts
-        blob = self.master.master._blobs
+        blob = self.master.master._store
 
         # datos del pmdl 2
         blob_2 = self._get_blob()
@@ -529,15 +591,12 @@ class MultiSelectTable(ctk.CTkFrame):
         ):
             return
 
+        subparts = []
         for subpart_2 in row_idx_2:
             # obtener la subparte del pmdl 2
             part_dat_2 = subparts_by_part_2[part_idx_2][subpart_2]
-            raw = export_sub_part(
-                blob_2,
-                part_idx_2,
-                part_dat_2
-                )
-            raw = bytearray(raw)
+            with export_sub_part(blob_2, part_idx_2, part_dat_2) as view:
+                raw = bytearray(view)
 
             # data chunk y chunk de la subparte a add
             dat_chunk = bytearray(b'\x00' * 0x10)
@@ -545,64 +604,15 @@ class MultiSelectTable(ctk.CTkFrame):
             struct.pack_into("<H", dat_chunk, 2, part_dat_2.num_bones)
             struct.pack_into("<4B", dat_chunk, 4, *part_dat_2.id_bones)
             struct.pack_into("<I", dat_chunk, 8, part_dat_2.unk)
-            chunk = raw
-
-            # ---- Header de la subparte ----
-            num_vertices, = struct.unpack_from("<H", dat_chunk, 0)
-            num_bones, = struct.unpack_from("<H", dat_chunk, 2)
-            id_bones = list(struct.unpack_from("<4B", dat_chunk, 4))
-            unk, = struct.unpack_from("<I", dat_chunk, 8)
-
-            # ---- Inserción binaria ----
-            part_dat = subparts_by_part[part_idx][insert_at]
-            data_part, cant, offset_insert = insert_sub_part(
-                blob,
-                part_idx,
-                part_dat,
-                chunk,
-                dat_chunk
-            )
-
-            # ---- Actualizar estructura de subpartes ----
-            sub_parts = subparts_by_part[part_idx]
-
-            new_entry = SubPartIndexEntry(
-                insert_at + 1,
-                offset_insert,
-                num_vertices,
-                num_bones,
-                id_bones,
-                unk
-            )
-            sub_parts.insert(insert_at + 1, new_entry)
-
-            # Reindexar IDs y ajustar offsets base (+0x10 del nuevo header)
-            for entry in sub_parts:
-                entry.sub_part = sub_parts.index(entry)
-                entry.sub_part_offset += 0x10
-
-            # Ajustar offsets de los que están después del insert real en el blob
-            for i in range(insert_at + 2, len(sub_parts)):
-                sub_parts[i].sub_part_offset += cant
-
-
-            # ---- Alinear y actualizar blob ----
-            del data_part[sub_parts[-1].sub_part_offset + calc_subpart_size(sub_parts[-1].num_vertices, sub_parts[-1].num_bones):]
-            align_16(data_part)
-            blob[str(part_idx)] = data_part
+            subparts.append((dat_chunk, raw))
 
-            # print(len(data_part))
+        # ---- Inserción binaria (todas a la vez) ----
+        part_dat = subparts_by_part[part_idx][insert_at]
+        data_part, _ = insert_sub_parts(blob, part_idx, part_dat, subparts)
 
-            # ---- Reemplazar parte completa en el modelo ----
-            replace_part(
-                self.parent_app._blob,
-                self.parent_app._hdr,
-                self.parent_app._parts,
-                data_part,
-                part_idx
-            )
-
-            insert_at+=1
+        # ---- Alinear y reemplazar parte completa en el modelo ----
+        trim_sub_parts(data_part)
+        blob.commit(part_idx, data_part)
 
         # ---- Refrescar tabla UI ----
         self.master.master.tab_left.set_table(
@@ -615,10 +625,8 @@ class MultiSelectTable(ctk.CTkFrame):
 
 
     def _delete_subparts(self):
-        band = False
         part_idx = self.master.master._index_opt_left
         row_idx = self.get_selected_row_indices()
-        row_idx_old = copy.deepcopy(row_idx)
 
         if not messagebox.askokcancel(
                 "Confirmar eliminación",
@@ -627,44 +635,14 @@ class MultiSelectTable(ctk.CTkFrame):
             return
 
         try:
-            for index_row in range(len(row_idx)):
-                blob = self._get_blob()
-                subparts_by_part = self._get_subparts()
-
-                if band:
-                    for cor in range(len(row_idx)):
-                        row_idx[cor]-=1
-                band = True
-
-                subpart_dat = subparts_by_part[part_idx][row_idx[index_row]]
-
-                data_part, cant = delete_sub_part(blob, part_idx, subpart_dat)
-
-                # eliminar datos de la subpart
-                del subparts_by_part[part_idx][subpart_dat.sub_part]
-
-                # arreglar offsets
-                for i in range(len(subparts_by_part[part_idx])):
-                    subparts_by_part[part_idx][i].sub_part_offset -= 0x10
-                    subparts_by_part[part_idx][i].sub_part = i
-
-                for i in range(subpart_dat.sub_part, len(subparts_by_part[part_idx])):
-                    subparts_by_part[part_idx][i].sub_part_offset -= cant
-
-                # ---- Alinear y actualizar blob ----
-                del data_part[subparts_by_part[part_idx][-1].sub_part_offset + calc_subpart_size(subparts_by_part[part_idx][-1].num_vertices,
-                                                                                       subparts_by_part[part_idx][-1].num_bones):]
-                align_16(data_part)
-                blob[str(part_idx)] = data_part
-
-                # ---- Reemplazar parte completa en el modelo ----
-                replace_part(
-                    self.parent_app._blob,
-                    self.parent_app._hdr,
-                    self.parent_app._parts,
-                    data_part,
-                    part_idx
-                )
+            blob = self._get_blob()
+
+            # ---- Eliminar todas las subpartes de una vez ----
+            data_part, _ = delete_sub_parts(blob, part_idx, row_idx)
+
+            # ---- Alinear y reemplazar parte completa en el modelo ----
+            trim_sub_parts(data_part)
+            blob.commit(part_idx, data_part)
 
             # ---- Refrescar tabla UI ----
             self.set_table(
@@ -673,7 +651,7 @@ class MultiSelectTable(ctk.CTkFrame):
                 part_idx
             )
 
-            messagebox.showinfo("Elimanado", f"SubPartes {row_idx_old} eliminadas correctamente")
+            messagebox.showinfo("Elimanado", f"SubPartes {row_idx} eliminadas correctamente")
         except Exception as e:
 
             messagebox.showerror(
@@ -681,6 +659,35 @@ class MultiSelectTable(ctk.CTkFrame):
                 f"Ocurrió un problema al eliminar las subpartes.\n{e}"
             )
 
+    def _transform_subparts(self, whole_part=False):
+        part_idx = self.master.master._index_opt_left
+        row_idx = None if whole_part else self.get_selected_row_indices()
+
+        values = TransformDialog(self, title="Transformar subpartes").get_values()
+        if values is None:
+            return
+        scale, offset, mirror = values
+
+        try:
+            blob = self._get_blob()
+
+            # ---- Transformar todos los vertices de una vez ----
+            data_part = transform_sub_parts(
+                blob,
+                part_idx,
+                transform_matrix(scale, mirror),
+                offset,
+                row_idx
+            )
+
+            # ---- Reemplazar parte completa en el modelo ----
+            blob.commit(part_idx, data_part)
+
+            target = f"Parte {part_idx:02} transformada" if whole_part else f"SubPartes {row_idx} transformadas"
+            messagebox.showinfo("Transformado", f"{target} correctamente")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
     # =========================
     # PANEL UPDATE
     # =========================
@@ -689,8 +696,8 @@ class MultiSelectTable(ctk.CTkFrame):
         if row_idx is None:
             return
 
-        path = self.parent_app._path if self.path == 0 else self.parent_app._path2
-        self.path_name = os.path.basename(path) if path else "--"
+        doc = self.parent_app._doc if self.path == 0 else self.parent_app._doc2
+        self.path_name = os.path.basename(doc.path) if doc else "--"
 
         ui = self.master.master # clase UiSubparts
         ui.label_name_part.configure(text=f"Pmdl: {self.path_name}")
@@ -726,11 +733,13 @@ class UiSubparts(ctk.CTkToplevel):
         self.grid_columnconfigure(1, weight=0, minsize=220)
         self.grid_rowconfigure(0, weight=1)
 
-        self._sub_parts = []
-        self._sub_parts2 = []
+        # índices de subpartes por parte, parseados al seleccionar cada parte
+        self._sub_parts: Optional[SubPartsCache] = None
+        self._sub_parts2: Optional[SubPartsCache] = None
 
-        self._blobs = {}
-        self._blobs2 = {}
+        # partes de cada documento (la fuente de verdad es el documento)
+        self._store: Optional[PartStore] = None
+        self._store2: Optional[PartStore] = None
 
         self._index_opt_left = 0
         self._index_opt_right = 0
@@ -750,7 +759,7 @@ class UiSubparts(ctk.CTkToplevel):
             values=["Part 0 - Capa: -"],
             width=160,
             command=self.on_left_option_changed,
-            name_window=os.path.basename(self.master._path) if self.master._path else "--"
+            name_window=os.path.basename(self.master._doc.path) if self.master._doc else "--"
         )
         self.opt_left.grid(row=0, column=0, pady=(0, 10), sticky="w")
         # self.opt_left.set("SubPart 0")
@@ -918,7 +927,7 @@ class UiSubparts(ctk.CTkToplevel):
             values=["Part 0 - Capa: -"],
             width=160,
             command=self.on_rigth_option_changed,
-            name_window=os.path.basename(self.master._path2) if self.master._path2 else "--"
+            name_window=os.path.basename(self.master._doc2.path) if self.master._doc2 else "--"
         )
         self.opt_right.grid(row=0, column=0, pady=(0, 10), sticky="w")
         # self.opt_right.set("SubPart 0")
@@ -940,36 +949,34 @@ class UiSubparts(ctk.CTkToplevel):
             print("Fila:", d)
 
     def get_data_subpart(self, pmdl=0):
-        parts_ids = len(self.master._parts if pmdl == 0 else self.master._parts2)
+        doc = self.master._doc if pmdl == 0 else self.master._doc2
+        if doc is None:
+            return
+        parts_ids = len(doc.parts)
         if parts_ids == 0:
             return
 
-        name_parts = []
-        # self._sub_parts = []
-        # self._sub_parts2 = []
-
-        for id_part in range(parts_ids):
-            data_part = export_part(self.master._blob if pmdl == 0 else self.master._blob2,
-                                    self.master._parts[id_part] if pmdl == 0 else self.master._parts2[id_part])
-
-            if pmdl == 0:
-                self._sub_parts.append(parse_subparts_index(data_part))
-                self._blobs[f"{id_part}"] = data_part
-            else:
-                self._sub_parts2.append(parse_subparts_index(data_part))
-                self._blobs2[f"{id_part}"] = data_part
-
-            capa_v = self.master._parts[id_part].part_id if pmdl == 0 else self.master._parts2[id_part].part_id
-            name_parts.append(f"Part: {id_part:02} - Capa: {capa_v:02X}")
+        store = PartStore(doc)
+        sub_parts = SubPartsCache(store)
+        name_parts = [
+            f"Part: {id_part:02} - Capa: {capa_v:02X}"
+            for id_part, capa_v in enumerate(doc.parts.records['part_id'].tolist())
+        ]
 
         if pmdl == 0:
+            self._store = store
+            self._sub_parts = sub_parts
+            self._index_opt_left = 0
             self.opt_left.configure(values=name_parts)
             self.opt_left.set(name_parts[0])
-            self.tab_left.set_table(len(self._sub_parts[0]), self._sub_parts)
+            self.tab_left.set_table(len(sub_parts[0]), sub_parts)
         else:
+            self._store2 = store
+            self._sub_parts2 = sub_parts
+            self._index_opt_right = 0
             self.opt_right.configure(values=name_parts)
             self.opt_right.set(name_parts[0])
-            self.tab_right.set_table(len(self._sub_parts2[0]), self._sub_parts2)
+            self.tab_right.set_table(len(sub_parts[0]), sub_parts)
 
         # print(self._sub_parts)
 
@@ -1004,9 +1011,9 @@ class UiSubparts(ctk.CTkToplevel):
             # guardar la id de la parte actual
             id_part = self._index_opt_left
 
-            # datos de la parte en bytes
-            part_data = self._sub_parts[0][id_part].blob_subpart
-            replace_part(self.master._blob, self.master._hdr, self.master._parts, part_data, id_part)
+            # las ediciones de subpartes se aplican al documento al momento
+            if self._store is None or id_part not in self._store:
+                raise ValueError("la parte no existe en memoria")
 
             messagebox.showinfo("Guardado", f"cambios guardados en ememorio")
         except Exception as e:
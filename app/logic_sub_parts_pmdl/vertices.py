@@ -0,0 +1,118 @@
+"""
+Codificación de los vértices de una subparte.
+
+Cada vértice ocupa `8 + 2 * num_bones` bytes (ver `calc_subpart_size`):
+
+    pesos     num_bones x u16
+    uv        2 x u8
+    posición  3 x s16 (x, y, z)
+"""
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+
+from app.logic_sub_parts_pmdl.sub_parts_index import SubPartIndexEntry, SubPartTable
+
+
+@lru_cache(maxsize=None)
+def vertex_dtype(num_bones: int) -> np.dtype:
+    """
+    dtype estructurado de un vértice con `num_bones` pesos.
+
+    :param num_bones: cantidad de huesos por vértice
+    :return: dtype con los campos 'weights', 'uv' y 'position'
+    """
+    if num_bones < 0:
+        raise ValueError("la cantidad de bones no puede ser negativa")
+
+    return np.dtype([
+        ('weights', '<u2', (num_bones,)),
+        ('uv', 'u1', (2,)),
+        ('position', '<i2', (3,)),
+    ])
+
+
+def decode_vertices(data_subpart, num_bones: int) -> np.ndarray:
+    """
+    Interpreta los bytes de una subparte como un array de vértices, sin copia.
+
+    El array comparte memoria con `data_subpart`: si el buffer es de solo
+    lectura el array también lo es, y si es un `bytearray` las escrituras en
+    el array modifican el buffer. Mientras el array exista el `bytearray` no
+    puede cambiar de tamaño, por lo que no debe conservarse más allá de su uso.
+
+    :param data_subpart: bytes de los vértices de la subparte
+    :param num_bones: cantidad de huesos por vértice
+    :return: array de `vertex_dtype(num_bones)`
+    """
+    dtype = vertex_dtype(num_bones)
+    if len(data_subpart) % dtype.itemsize:
+        raise ValueError(
+            f"el tamaño de la subparte ({len(data_subpart)} bytes) no es multiplo "
+            f"del tamaño del vertice ({dtype.itemsize} bytes)"
+        )
+    return np.frombuffer(data_subpart, dtype=dtype)
+
+
+def subpart_vertices(data_part, subpart: SubPartIndexEntry) -> np.ndarray:
+    """
+    Vértices de una subparte dentro de los bytes de su parte, sin copia.
+
+    :param data_part: bytes de la parte (con `bytearray` el array es editable)
+    :param subpart: info de la subpart
+    :return: array de `vertex_dtype(subpart.num_bones)`
+    """
+    offset = subpart.sub_part_offset
+    size = subpart.num_vertices * vertex_dtype(subpart.num_bones).itemsize
+
+    if offset + size > len(data_part):
+        raise ValueError(f"los vertices de la subparte {subpart.sub_part} exceden la parte")
+
+    return decode_vertices(memoryview(data_part)[offset:offset + size], subpart.num_bones)
+
+
+def transform_matrix(scale: Sequence[float] = (1.0, 1.0, 1.0), mirror: str = "") -> np.ndarray:
+    """
+    Matriz 3x3 de escala y espejo por eje.
+
+    :param scale: factor de escala en x, y, z
+    :param mirror: ejes a reflejar, por ejemplo "x" o "xz"
+    :return: matriz diagonal
+    """
+    factors = np.array(scale, dtype=np.float64)
+    for axis in mirror.lower():
+        if axis not in "xyz":
+            raise ValueError(f"eje de espejo invalido: {axis}")
+        factors["xyz".index(axis)] *= -1
+    return np.diag(factors)
+
+
+def transform_positions(data_part: bytearray, table: SubPartTable, matrix: np.ndarray,
+                        offset: Sequence[float] = (0.0, 0.0, 0.0), indices=None):
+    """
+    Aplica `posición * matrix + offset` a los vértices de varias subpartes.
+
+    Cada subparte se decodifica sin copia (`subpart_vertices`) y su columna
+    'position' se transforma de una vez y se escribe sobre la parte. Los
+    resultados se redondean y se limitan al rango de s16.
+
+    :param data_part: bytes de la parte (modificados in-place)
+    :param table: índice de subpartes de la parte
+    :param matrix: matriz 3x3 (ver `transform_matrix`)
+    :param offset: traslación en x, y, z
+    :param indices: subpartes a transformar (todas si es None)
+    """
+    if indices is None:
+        indices = range(len(table))
+    matrix = np.asarray(matrix, dtype=np.float64).T
+    offset = np.asarray(offset, dtype=np.float64)
+    if not (np.isfinite(matrix).all() and np.isfinite(offset).all()):
+        raise ValueError("los valores de escala y traslacion deben ser finitos")
+
+    for i in indices:
+        vertices = subpart_vertices(data_part, table[i])
+        result = vertices['position'] @ matrix + offset
+        np.clip(np.rint(result), -0x8000, 0x7FFF, out=result)
+        vertices['position'] = result
+        del vertices
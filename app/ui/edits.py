@@ -0,0 +1,96 @@
+"""
+Acumulación de ediciones de la tabla de partes.
+
+Los widgets (sliders, entradas, combos) pueden disparar muchos eventos por
+segundo; las ediciones se agrupan por parte y campo, y se entregan juntas una
+vez por cuadro, quedándose solo el último valor de cada campo.
+"""
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional, Sequence
+
+
+FRAME_MS = 16   # Intervalo de entrega (~60 por segundo)
+
+PartEdits = Dict[int, Dict[str, Any]]
+
+
+class EditBuffer:
+    """
+    Ediciones pendientes {índice de parte: {campo: valor}}.
+
+    La primera edición programa la entrega con `after()`; las que llegan antes
+    de esa entrega solo reemplazan el valor pendiente. `on_flush` devuelve si
+    aplicó las ediciones: si las rechaza, siguen pendientes hasta la próxima
+    entrega.
+    """
+
+    def __init__(self, widget, on_flush: Callable[[PartEdits], bool], delay_ms: int = FRAME_MS):
+        self._widget = widget
+        self._on_flush = on_flush
+        self._delay_ms = delay_ms
+        self._pending: PartEdits = {}
+        self._after_id = None
+
+    def __bool__(self) -> bool:
+        return bool(self._pending)
+
+    def push(self, index: int, field: str, value: Any):
+        """Registra el nuevo valor de `field` para la parte `index`."""
+        self._pending.setdefault(index, {})[field] = value
+        if self._after_id is None:
+            self._after_id = self._widget.after(self._delay_ms, self._on_timer)
+
+    def flush(self) -> bool:
+        """
+        Entrega ya las ediciones pendientes, si las hay.
+
+        Devuelve False si el receptor las rechazó; en ese caso se conservan,
+        con prioridad para las que llegaron durante la entrega.
+        """
+        self._cancel()
+        if not self._pending:
+            return True
+        edits, self._pending = self._pending, {}
+        if self._on_flush(edits):
+            return True
+
+        for i, fields in self._pending.items():
+            edits.setdefault(i, {}).update(fields)
+        self._pending = edits
+        return False
+
+    def discard(self):
+        """Descarta las ediciones pendientes sin entregarlas."""
+        self._cancel()
+        self._pending = {}
+
+    def remap_inserted(self, positions: Sequence[int]):
+        """Ajusta los índices pendientes tras insertar partes en `positions` (finales)."""
+        def new_index(i: int) -> int:
+            for p in positions:
+                if p <= i:
+                    i += 1
+            return i
+        self._remap(new_index)
+
+    def remap_removed(self, positions: Sequence[int]):
+        """Ajusta los índices pendientes tras quitar las partes en `positions` (previas)."""
+        removed = set(positions)
+        self._remap(lambda i: None if i in removed else i - bisect_left(positions, i))
+
+    def _remap(self, new_index: Callable[[int], Optional[int]]):
+        pending = {}
+        for i, fields in self._pending.items():
+            j = new_index(i)
+            if j is not None:
+                pending[j] = fields
+        self._pending = pending
+
+    def _on_timer(self):
+        self._after_id = None
+        self.flush()
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
@@ -1,36 +1,309 @@
+import sys
 import tkinter as tk
+from abc import ABCMeta, abstractmethod
 import customtkinter as ctk
-from typing import List, Callable
-from app.core import PartIndexEntry, FLAG_MAP_VALUE_TO_LABEL
+from typing import Callable, List, Optional
+from app.core import (
+    PartTable, PartsEvent, FLAG_MAP_VALUE_TO_LABEL, percent_from_opacity_u16,
+    PARTS_INSERTED, PARTS_REMOVED, PARTS_UPDATED, PARTS_RENUMBERED
+)
+from .edits import EditBuffer, PartEdits
 
 
-class PartsTable(ctk.CTkScrollableFrame):
-    """Tabla editable para el PMDL principal."""
-    
-    def __init__(self, master, on_depth_change: Callable, on_opacity_change: Callable,
-                 on_flag_change: Callable, on_export_part: Callable, on_delete_part: Callable):
+ROW_HEIGHT = 32      # Alto de una fila (widgets + padding)
+HEADER_HEIGHT = 64   # Alto de la barra superior + encabezados
+WHEEL_ROWS = 3       # Filas por paso de la rueda del mouse
+
+
+def _row_color(index: int):
+    """Color de fondo de una fila (zebra striping)."""
+    return ("gray85", "gray20") if index % 2 == 0 else ("gray90", "gray17")
+
+
+class _RowSlot:
+    """Fila reutilizable de una tabla virtualizada: widgets ligados a una parte."""
+
+    def __init__(self, row: int):
+        self.row = row          # fila de la grilla
+        self.index = -1         # parte mostrada (-1 = ninguna)
+        self.shown = False
+        self.widgets: List[tk.Widget] = []
+
+
+class _VirtualPartsTable(ctk.CTkFrame, metaclass=ABCMeta):
+    """
+    Tabla de partes virtualizada.
+
+    Solo existen los widgets de las filas visibles: al desplazarse, las mismas
+    filas se vuelven a ligar a otras partes del modelo (`PartTable`), que es la
+    fuente de verdad. La selección se guarda por índice de parte, no en los
+    widgets.
+
+    Mientras una operación en segundo plano modifica el modelo, la tabla se
+    congela (`freeze()`): no lo lee y pospone los cambios hasta `thaw()`.
+    """
+
+    COLUMNS = 6
+
+    def __init__(self, master, headers: List[str]):
         super().__init__(master, corner_radius=8)
-        
-        self.on_depth_change = on_depth_change
-        self.on_opacity_change = on_opacity_change
-        self.on_flag_change = on_flag_change
+
+        self._parts: Optional[PartTable] = None
+        self._selected: List[bool] = []
+        self._slots: List[_RowSlot] = []
+        self._first = 0
+        self._visible = 1
+        self._frozen = False
+        self._deferred: List[PartsEvent] = []
+
+        # Encabezados (fila 1)
+        for col, text in enumerate(headers):
+            lbl = ctk.CTkLabel(self, text=text, font=("Segoe UI", 12))
+            lbl.grid(row=1, column=col, padx=(6, 4), pady=(4, 4), sticky="w")
+
+        # Barra de desplazamiento
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=2, column=self.COLUMNS, sticky="ns", padx=(0, 2))
+        self._scrollbar.set(0.0, 1.0)
+
+        self.bind("<Configure>", self._on_configure)
+        self.bind_all("<MouseWheel>", self._on_mouse_wheel, add="+")
+        self.bind_all("<Button-4>", self._on_mouse_wheel, add="+")
+        self.bind_all("<Button-5>", self._on_mouse_wheel, add="+")
+
+    # ----- Modelo -----
+
+    def clear(self):
+        """Desliga la tabla del modelo y oculta todas las filas."""
+        self._parts = None
+        self._selected = []
+        self._deferred = []
+        self._first = 0
+        self._refresh()
+
+    def populate(self, parts: PartTable):
+        """Liga la tabla a las partes del PMDL y muestra las filas visibles."""
+        self._parts = parts
+        self._selected = [False] * len(parts)
+        self._deferred = []
+        self._first = min(self._first, self._max_first())
+        self._refresh()
+
+    def apply_change(self, event: PartsEvent):
+        """
+        Aplica un cambio del documento tocando solo las filas afectadas.
+
+        Las altas y bajas ajustan la selección y la cantidad de filas; las
+        filas visibles solo se vuelven a ligar si cambiaron sus datos o su
+        número. Con la tabla congelada, el cambio se aplica al descongelarla.
+        """
+        if self._parts is None:
+            return
+        if self._frozen:
+            self._deferred.append(event)
+            return
+        self._apply_change(event)
+
+    def freeze(self):
+        """Deja de leer el modelo; las filas conservan lo que muestran."""
+        self._frozen = True
+
+    def thaw(self):
+        """Aplica los cambios pospuestos, en orden, y vuelve a ligar las filas."""
+        if not self._frozen:
+            return
+        self._frozen = False
+        deferred, self._deferred = self._deferred, []
+        for event in deferred:
+            self._apply_change(event)
+        self._first = min(self._first, self._max_first())
+        self._refresh()
+
+    def _apply_change(self, event: PartsEvent):
+        if event.kind == PARTS_INSERTED:
+            for i in event.indices:
+                self._selected.insert(i, False)
+            self._refresh(rebind_from=self._count(), rebind=set(event.indices))
+        elif event.kind == PARTS_REMOVED:
+            for i in reversed(event.indices):
+                del self._selected[i]
+            self._first = min(self._first, self._max_first())
+            self._refresh(rebind_from=self._count())
+        elif event.kind == PARTS_UPDATED:
+            for i in event.indices:
+                self._refresh_index(i)
+        elif event.kind == PARTS_RENUMBERED:
+            self._refresh(rebind_from=event.start)
+
+    def get_selected_indices(self) -> List[int]:
+        """Índices de las partes marcadas en la tabla."""
+        return [i for i, selected in enumerate(self._selected) if selected]
+
+    def _count(self) -> int:
+        return len(self._parts) if self._parts is not None else 0
+
+    # ----- Filas -----
+
+    @abstractmethod
+    def _create_slot(self, row: int) -> _RowSlot:
+        """Crea los widgets (ocultos) de una fila de la grilla."""
+
+    @abstractmethod
+    def _bind_slot(self, slot: _RowSlot, index: int):
+        """Muestra en `slot` los datos de la parte `index`."""
+
+    def _flush_pending(self):
+        """Confirma ediciones pendientes en los widgets antes de reutilizarlos."""
+
+    def _ensure_slots(self, count: int):
+        """Crea filas hasta tener `count` (las filas nunca se destruyen)."""
+        while len(self._slots) < count:
+            row = len(self._slots) + 2
+            self.grid_rowconfigure(row, minsize=ROW_HEIGHT)
+            self._slots.append(self._create_slot(row))
+        self._scrollbar.grid_configure(rowspan=max(1, len(self._slots)))
+
+    def _refresh(self, rebind_from: int = 0, rebind=()):
+        """
+        Liga las filas visibles a sus partes y oculta las sobrantes.
+
+        Una fila que ya mostraba su parte solo se vuelve a ligar si su índice
+        es mayor o igual a `rebind_from` o está en `rebind`.
+        """
+        if self._frozen:
+            return
+        count = self._count()
+        self._ensure_slots(min(self._visible, count))
+
+        for k, slot in enumerate(self._slots):
+            index = self._first + k
+            if k < self._visible and index < count:
+                if slot.index != index or index >= rebind_from or index in rebind:
+                    self._bind_slot(slot, index)
+                slot.index = index
+                if not slot.shown:
+                    for w in slot.widgets:
+                        w.grid()
+                    slot.shown = True
+            else:
+                slot.index = -1
+                if slot.shown:
+                    for w in slot.widgets:
+                        w.grid_remove()
+                    slot.shown = False
+
+        self._update_scrollbar()
+
+    def _refresh_index(self, index: int):
+        """Vuelve a ligar la fila de una parte si está visible."""
+        if self._frozen:
+            return
+        k = index - self._first
+        if 0 <= k < len(self._slots) and self._slots[k].index == index:
+            self._bind_slot(self._slots[k], index)
+
+    # ----- Desplazamiento -----
+
+    def _max_first(self) -> int:
+        return max(0, self._count() - self._visible)
+
+    def _scroll_to(self, first: int):
+        if self._frozen:
+            return
+        first = max(0, min(self._max_first(), first))
+        if first == self._first:
+            return
+        self._flush_pending()
+        self._first = first
+        self._refresh()
+
+    def _update_scrollbar(self):
+        count = self._count()
+        if count <= self._visible:
+            self._scrollbar.set(0.0, 1.0)
+        else:
+            self._scrollbar.set(self._first / count, (self._first + self._visible) / count)
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - HEADER_HEIGHT) // ROW_HEIGHT)
+        if visible != self._visible:
+            self._visible = visible
+            self._first = min(self._first, self._max_first())
+            self._refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * self._count()))
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self._scroll_to(self._first + int(args[1]) * step)
+
+    def _on_mouse_wheel(self, event):
+        if not self._contains(event.widget):
+            return
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        elif sys.platform == "darwin":
+            steps = -event.delta
+        else:
+            steps = -int(event.delta / 120)
+        self._scroll_to(self._first + steps * WHEEL_ROWS)
+
+    def _contains(self, widget) -> bool:
+        """Indica si `widget` está dentro de la tabla."""
+        while widget is not None:
+            if widget is self:
+                return True
+            widget = getattr(widget, "master", None)
+        return False
+
+    # ----- Helpers -----
+
+    def _grid_row_widgets(self, slot: _RowSlot, widgets: List[tuple]):
+        """Ubica los widgets de una fila (widget, columna, padx) y los deja ocultos."""
+        for w, col, padx in widgets:
+            w.grid(row=slot.row, column=col, padx=padx, pady=(2, 2), sticky="w")
+            w.grid_remove()
+            slot.widgets.append(w)
+
+    def _create_row_background(self, slot: _RowSlot) -> ctk.CTkFrame:
+        row_bg = ctk.CTkFrame(self, fg_color=_row_color(0), corner_radius=0, height=28)
+        row_bg.grid(row=slot.row, column=0, columnspan=self.COLUMNS, sticky="ew", padx=0, pady=0)
+        row_bg.grid_remove()
+        slot.widgets.append(row_bg)
+        return row_bg
+
+    def _on_close_requested(self, title: str, message: str, handler: str):
+        """Pide confirmación y llama al método `handler` del controlador."""
+        from tkinter import messagebox
+        if messagebox.askyesno(title, message):
+            # Llamar al método del controlador para limpiar todo
+            app = self.winfo_toplevel()
+            if hasattr(app, handler):
+                getattr(app, handler)()
+
+
+class PartsTable(_VirtualPartsTable):
+    """Tabla editable para el PMDL principal."""
+
+    def __init__(self, master, on_parts_edited: Callable, on_export_part: Callable,
+                 on_delete_part: Callable, on_delete_parts: Callable = None):
+        super().__init__(master, ["Capa", "Nombre", "Tamaño", "Opacidad", "Función", "Exportar Parte"])
+
+        self.on_parts_edited = on_parts_edited
         self.on_export_part = on_export_part
         self.on_delete_part = on_delete_part
-        
+        self.on_delete_parts = on_delete_parts
+
         # Estado UI
-        self._rows_widgets = []
-        self._row_backgrounds = []
         self._controls_frame = None
         self._parts_count_label = None
         self._top_import_btn = None
+        self._delete_selected_btn = None
         self._close_btn = None
-        
-        # Encabezados (fila 1)
-        headers = ["Capa", "Nombre", "Tamaño", "Opacidad", "Función", "Exportar Parte"]
-        for col, text in enumerate(headers):
-            lbl = ctk.CTkLabel(self, text=text, font=("Segoe UI", 12))
-            lbl.grid(row=1, column=col, padx=(6, 4), pady=(4, 4), sticky="w")
-        
+
         # Columnas
         self.grid_columnconfigure(0, weight=0)  # Capa
         self.grid_columnconfigure(1, weight=1)  # Nombre
@@ -38,38 +311,41 @@ class PartsTable(ctk.CTkScrollableFrame):
         self.grid_columnconfigure(3, weight=0)  # Opacidad
         self.grid_columnconfigure(4, weight=0)  # Función
         self.grid_columnconfigure(5, weight=0)  # Exportar Parte
-        
+
         # Validación para campo hex (Capa)
         self._vcmd = (self.register(self._validate_hex_keystroke), "%P")
-    
+
+        # Ediciones de capa, opacidad y función: se entregan una vez por cuadro
+        self._edits = EditBuffer(self, self._on_edits)
+
     def show_top_controls(self, part_count: int, on_import_part_cb: Callable):
         """Muestra los controles superiores (contador, botones)."""
-        if self._controls_frame is not None:
-            try:
-                self._controls_frame.destroy()
-            except Exception:
-                pass
-            self._controls_frame = None
-            self._parts_count_label = None
-            self._top_import_btn = None
-            self._close_btn = None
-        
+        self.hide_top_controls()
+
         self._controls_frame = ctk.CTkFrame(self, fg_color="transparent")
         self._controls_frame.grid(row=0, column=0, columnspan=6, padx=(6, 4), pady=(4, 0), sticky="we")
-        
+
         # Contador de partes
         self._parts_count_label = ctk.CTkLabel(
             self._controls_frame, text=f"Partes: {part_count}", font=("Segoe UI", 12)
         )
         self._parts_count_label.pack(side="left", padx=(0, 8))
-        
+
         # Botón Importar Parte
         self._top_import_btn = ctk.CTkButton(
             self._controls_frame, text="Importar Parte", width=120, height=24,
             font=("Segoe UI", 12), command=on_import_part_cb
         )
         self._top_import_btn.pack(side="left", padx=(0, 8))
-        
+
+        # Botón Borrar Seleccionadas
+        self._delete_selected_btn = ctk.CTkButton(
+            self._controls_frame, text="Borrar Seleccionadas", width=140, height=24,
+            font=("Segoe UI", 12), fg_color="#DC2626", hover_color="#B91C1C",
+            command=self._on_delete_selected
+        )
+        self._delete_selected_btn.pack(side="left", padx=(0, 8))
+
         # Botón Cerrar PMDL
         self._close_btn = ctk.CTkButton(
             self._controls_frame, text="Cerrar PMDL", width=100, height=24,
@@ -77,7 +353,7 @@ class PartsTable(ctk.CTkScrollableFrame):
             command=self._on_close_pmdl
         )
         self._close_btn.pack(side="left", padx=(0, 0))
-    
+
     def hide_top_controls(self):
         """Oculta los controles superiores."""
         if self._controls_frame is not None:
@@ -88,155 +364,154 @@ class PartsTable(ctk.CTkScrollableFrame):
             self._controls_frame = None
             self._parts_count_label = None
             self._top_import_btn = None
+            self._delete_selected_btn = None
             self._close_btn = None
-    
+
     def update_part_count(self, part_count: int):
         """Actualiza el contador de partes."""
         if self._parts_count_label is not None:
             self._parts_count_label.configure(text=f"Partes: {part_count}")
-    
+
+    # ----- Modelo -----
+
     def clear(self):
-        """Limpia todas las filas de la tabla."""
-        for ws in self._rows_widgets:
-            for w in ws:
-                try:
-                    w.destroy()
-                except Exception:
-                    pass
-        self._rows_widgets.clear()
-        
-        # Limpiar backgrounds de zebra striping
-        for bg in self._row_backgrounds:
-            try:
-                bg.destroy()
-            except Exception:
-                pass
-        self._row_backgrounds.clear()
-    
-    def populate(self, parts: List[PartIndexEntry]):
-        """Puebla la tabla con las partes del PMDL."""
-        self.clear()
-        
-        for i, p in enumerate(parts):
-            row = i + 2
-            
-            # Zebra striping
-            is_even = i % 2 == 0
-            bg_color = ("gray85", "gray20") if is_even else ("gray90", "gray17")
-            
-            # Frame de fondo para la fila
-            row_bg = ctk.CTkFrame(self, fg_color=bg_color, corner_radius=0, height=28)
-            row_bg.grid(row=row, column=0, columnspan=6, sticky="ew", padx=0, pady=0)
-            self._row_backgrounds.append(row_bg)
-            
-            # Capa
-            depth_hex = f"{p.part_id & 0xFF:02X}"
-            depth_entry = ctk.CTkEntry(self, width=56, justify="center", font=("Segoe UI", 12), fg_color=bg_color)
-            depth_entry.insert(0, depth_hex)
-            depth_entry.configure(validate="key", validatecommand=self._vcmd)
-            depth_entry.bind("<FocusOut>", lambda e, idx=i: self._commit_depth(e.widget.get(), idx, e.widget))
-            depth_entry.bind("<Return>", lambda e, idx=i: self._commit_depth(e.widget.get(), idx, e.widget))
-            depth_entry.grid(row=row, column=0, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Nombre
-            name_lbl = ctk.CTkLabel(self, text=f"Parte_{i}", font=("Segoe UI", 12), fg_color=bg_color)
-            name_lbl.grid(row=row, column=1, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Tamaño
-            size_lbl = ctk.CTkLabel(self, text=f"{p.part_length:X}", font=("Segoe UI", 12), fg_color=bg_color)
-            size_lbl.grid(row=row, column=2, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Opacidad
-            if p.opacity <= 0:
-                pct = 0
-            elif p.opacity >= 0xFFFF:
-                pct = 100
-            else:
-                pct = round(p.opacity * 100 / 0xFFFF)
-            
-            pct_lbl = ctk.CTkLabel(self, text=f"{pct}%", width=36, font=("Segoe UI", 12), fg_color=bg_color)
-            pct_lbl.grid(row=row, column=3, padx=(6, 2), pady=(2, 2), sticky="w")
-            
-            slider = ctk.CTkSlider(self, from_=0, to=100, number_of_steps=100, width=60, height=10, fg_color=bg_color)
-            slider.set(pct)
-            slider.configure(command=lambda val, idx=i, lbl=pct_lbl: self._on_opacity(val, idx, lbl))
-            slider.grid(row=row, column=3, padx=(46, 2), pady=(2, 2), sticky="w")
-            
-            # Función
-            init_label = FLAG_MAP_VALUE_TO_LABEL.get(p.special_flag, "Ninguna")
-            flag_var = tk.StringVar(value=init_label)
-            
-            flag_opt = ctk.CTkComboBox(
-                self,
-                values=list(FLAG_MAP_VALUE_TO_LABEL.values()),
-                variable=flag_var,
-                width=100,
-                font=("Segoe UI", 12),
-                state="readonly",
-                fg_color=bg_color,
-                command=lambda new_label, idx=i: self._on_flag(idx, new_label)
-            )
-            flag_opt.grid(row=row, column=4, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Acción: Exportar + Borrar
-            action_frame = ctk.CTkFrame(self, fg_color="transparent")
-            action_frame.grid(row=row, column=5, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            export_btn = ctk.CTkButton(action_frame, text="Exportar", width=60, font=("Segoe UI", 12),
-                                       command=lambda idx=i: self._on_export(idx))
-            export_btn.pack(side="left", padx=(0, 6))
-            
-            del_btn = ctk.CTkButton(
-                action_frame, text="🗑", width=40, font=("Segoe UI", 12),
-                fg_color="#DC2626", hover_color="#B91C1C",
-                command=lambda idx=i: self._on_delete(idx)
-            )
-            del_btn.pack(side="left", padx=(0, 0))
-            
-            self._rows_widgets.append([depth_entry, name_lbl, size_lbl, pct_lbl, slider, flag_opt, export_btn, del_btn])
-    
-    def get_ui_data(self) -> List[dict]:
-        """Obtiene los datos actuales de la UI."""
-        data = []
-        for ws in self._rows_widgets:
-            try:
-                depth_entry = ws[0]
-                slider = ws[4]
-                flag_opt = ws[5]
-                
-                # Depth
-                txt = (depth_entry.get() or "").strip().upper()
-                if txt == "":
-                    txt = "00"
-                try:
-                    depth = int(txt, 16) & 0xFF
-                except Exception:
-                    depth = 0
-                
-                # Opacity
-                try:
-                    opacity_pct = int(round(float(slider.get())))
-                except Exception:
-                    opacity_pct = 100
-                
-                # Flag
-                try:
-                    flag_label = flag_opt.get()
-                except Exception:
-                    flag_label = "Ninguna"
-                
-                data.append({
-                    'depth': depth,
-                    'opacity_pct': opacity_pct,
-                    'flag_label': flag_label
-                })
-            except Exception:
+        self._edits.discard()
+        super().clear()
+
+    def populate(self, parts: PartTable):
+        self._edits.discard()
+        super().populate(parts)
+
+    def _apply_change(self, event: PartsEvent):
+        # Las ediciones pendientes siguen a su parte tras altas y bajas
+        if event.kind == PARTS_INSERTED:
+            self._edits.remap_inserted(event.indices)
+        elif event.kind == PARTS_REMOVED:
+            self._edits.remap_removed(event.indices)
+        super()._apply_change(event)
+
+    def flush_edits(self) -> bool:
+        """
+        Confirma las capas escritas y entrega ya las ediciones pendientes.
+
+        Devuelve False si el controlador no las aplicó y siguen pendientes.
+        """
+        self._flush_pending()
+        return not self._edits
+
+    # ----- Filas -----
+
+    def _create_slot(self, row: int) -> _RowSlot:
+        slot = _RowSlot(row)
+        bg_color = _row_color(0)
+
+        # Frame de fondo para la fila
+        slot.row_bg = self._create_row_background(slot)
+
+        # Capa
+        slot.depth_entry = ctk.CTkEntry(self, width=56, justify="center", font=("Segoe UI", 12), fg_color=bg_color)
+        slot.depth_entry.configure(validate="key", validatecommand=self._vcmd)
+        slot.depth_entry.bind("<FocusOut>", lambda e, s=slot: self._commit_depth(e.widget.get(), s.index, e.widget))
+        slot.depth_entry.bind("<Return>", lambda e, s=slot: self._commit_depth(e.widget.get(), s.index, e.widget))
+
+        # Nombre
+        slot.name_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+
+        # Tamaño
+        slot.size_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+
+        # Opacidad
+        slot.pct_lbl = ctk.CTkLabel(self, text="", width=36, font=("Segoe UI", 12), fg_color=bg_color)
+        slot.slider = ctk.CTkSlider(self, from_=0, to=100, number_of_steps=100, width=60, height=10, fg_color=bg_color)
+        slot.slider.configure(command=lambda val, s=slot: self._on_opacity(val, s.index, s.pct_lbl))
+
+        # Función
+        slot.flag_var = tk.StringVar(value="Ninguna")
+        slot.flag_opt = ctk.CTkComboBox(
+            self,
+            values=list(FLAG_MAP_VALUE_TO_LABEL.values()),
+            variable=slot.flag_var,
+            width=100,
+            font=("Segoe UI", 12),
+            state="readonly",
+            fg_color=bg_color,
+            command=lambda new_label, s=slot: self._on_flag(s.index, new_label)
+        )
+
+        # Acción: Seleccionar + Exportar + Borrar
+        action_frame = ctk.CTkFrame(self, fg_color="transparent")
+
+        slot.selected_var = tk.BooleanVar(value=False)
+        select_chk = ctk.CTkCheckBox(action_frame, text="", width=24, checkbox_width=18,
+                                     checkbox_height=18, variable=slot.selected_var,
+                                     command=lambda s=slot: self._on_select(s))
+        select_chk.pack(side="left", padx=(0, 4))
+
+        export_btn = ctk.CTkButton(action_frame, text="Exportar", width=60, font=("Segoe UI", 12),
+                                   command=lambda s=slot: self._on_export(s.index))
+        export_btn.pack(side="left", padx=(0, 6))
+
+        del_btn = ctk.CTkButton(
+            action_frame, text="🗑", width=40, font=("Segoe UI", 12),
+            fg_color="#DC2626", hover_color="#B91C1C",
+            command=lambda s=slot: self._on_delete(s.index)
+        )
+        del_btn.pack(side="left", padx=(0, 0))
+
+        self._grid_row_widgets(slot, [
+            (slot.depth_entry, 0, (6, 4)),
+            (slot.name_lbl, 1, (6, 4)),
+            (slot.size_lbl, 2, (6, 4)),
+            (slot.pct_lbl, 3, (6, 2)),
+            (slot.slider, 3, (46, 2)),
+            (slot.flag_opt, 4, (6, 4)),
+            (action_frame, 5, (6, 4)),
+        ])
+        return slot
+
+    def _bind_slot(self, slot: _RowSlot, index: int):
+        p = self._parts[index]
+
+        # Zebra striping
+        bg_color = _row_color(index)
+        if slot.index < 0 or (slot.index - index) % 2:
+            for w in (slot.row_bg, slot.depth_entry, slot.name_lbl, slot.size_lbl, slot.pct_lbl,
+                      slot.slider, slot.flag_opt):
+                w.configure(fg_color=bg_color)
+
+        # Capa
+        slot.depth_entry.delete(0, tk.END)
+        slot.depth_entry.insert(0, f"{p.part_id & 0xFF:02X}")
+
+        slot.name_lbl.configure(text=f"Parte_{index}")
+        slot.size_lbl.configure(text=f"{p.part_length:X}")
+
+        # Opacidad
+        pct = percent_from_opacity_u16(p.opacity)
+        slot.pct_lbl.configure(text=f"{pct}%")
+        slot.slider.set(pct)
+
+        # Función
+        slot.flag_var.set(FLAG_MAP_VALUE_TO_LABEL.get(p.special_flag, "Ninguna"))
+
+        slot.selected_var.set(self._selected[index])
+
+    def _flush_pending(self):
+        """Confirma las capas escritas y no confirmadas de las filas visibles."""
+        if self._frozen:
+            # Las filas muestran partes que el modelo quizá ya no tiene
+            self._edits.flush()
+            return
+        for slot in self._slots:
+            if slot.index < 0:
                 continue
-        
-        return data
-    
+            text = (slot.depth_entry.get() or "").strip().upper()
+            if text != f"{self._parts[slot.index].part_id & 0xFF:02X}":
+                self._commit_depth(text, slot.index, slot.depth_entry)
+        self._edits.flush()
+
     # ----- Helpers / Validaciones / Callbacks -----
-    
+
     def _validate_hex_keystroke(self, proposed: str) -> bool:
         """Valida entrada hexadecimal."""
         s = proposed.strip()
@@ -248,9 +523,11 @@ class PartsTable(ctk.CTkScrollableFrame):
             if ch not in "0123456789abcdefABCDEF":
                 return False
         return True
-    
+
     def _commit_depth(self, text: str, part_index: int, widget: tk.Widget):
         """Confirma el cambio de profundidad."""
+        if part_index < 0:
+            return
         s = (text or "").strip().upper()
         if s == "":
             s = "00"
@@ -259,66 +536,90 @@ class PartsTable(ctk.CTkScrollableFrame):
         except Exception:
             val = 0
         val = max(0, min(0xFF, val))
-        
+
         if isinstance(widget, (tk.Entry, ctk.CTkEntry)):
             widget.delete(0, tk.END)
             widget.insert(0, f"{val:02X}")
-        
-        if callable(self.on_depth_change):
-            self.on_depth_change(part_index, val)
-    
+
+        self._edits.push(part_index, 'depth', val)
+
     def _on_opacity(self, value, part_index: int, label_widget: ctk.CTkLabel):
         """Callback de cambio de opacidad."""
+        if part_index < 0:
+            return
         try:
             pct = int(round(float(value)))
         except Exception:
             pct = 0
         pct = max(0, min(100, pct))
         label_widget.configure(text=f"{pct}%")
-        
-        if callable(self.on_opacity_change):
-            self.on_opacity_change(part_index, pct)
-    
+
+        self._edits.push(part_index, 'opacity_pct', pct)
+
     def _on_flag(self, part_index: int, new_label: str):
         """Callback de cambio de función."""
-        if callable(self.on_flag_change):
-            self.on_flag_change(part_index, new_label)
-    
+        if part_index >= 0:
+            self._edits.push(part_index, 'flag_label', new_label)
+
+    def _on_edits(self, edits: PartEdits) -> bool:
+        """Entrega las ediciones acumuladas; devuelve si el controlador las aplicó."""
+        if not callable(self.on_parts_edited):
+            return True
+        return bool(self.on_parts_edited(edits))
+
+    def _on_select(self, slot: _RowSlot):
+        """Guarda la marca de selección de la parte de la fila."""
+        if slot.index >= 0:
+            self._selected[slot.index] = bool(slot.selected_var.get())
+
     def _on_export(self, part_index: int):
         """Callback de exportación."""
-        if callable(self.on_export_part):
+        if part_index >= 0 and callable(self.on_export_part):
             self.on_export_part(part_index)
-    
+
     def _on_delete(self, part_index: int):
         """Callback de eliminación."""
-        if callable(self.on_delete_part):
+        if part_index >= 0 and callable(self.on_delete_part):
             self.on_delete_part(part_index)
-    
+
+    def _on_delete_selected(self):
+        """Callback de eliminación de las partes seleccionadas."""
+        if callable(self.on_delete_parts):
+            self.on_delete_parts(self.get_selected_indices())
+
     def _on_close_pmdl(self):
         """Callback para cerrar el PMDL."""
-        from tkinter import messagebox
-        if messagebox.askyesno("Cerrar PMDL", "¿Estás seguro de que deseas cerrar el PMDL principal?\nSe perderán todos los cambios no guardados."):
-            # Llamar al método del controlador para limpiar todo
-            if hasattr(self.master, 'master') and hasattr(self.master.master, 'on_close_pmdl_main'):
-                self.master.master.on_close_pmdl_main()
+        self._on_close_requested(
+            "Cerrar PMDL",
+            "¿Estás seguro de que deseas cerrar el PMDL principal?\nSe perderán todos los cambios no guardados.",
+            'on_close_pmdl_main'
+        )
 
 
-class SecondaryPartsTable(ctk.CTkScrollableFrame):
+class SecondaryPartsTable(_VirtualPartsTable):
     """Tabla de solo lectura para PMDL secundario."""
-    
-    def __init__(self, master, on_add_part: Callable):
-        super().__init__(master, corner_radius=8)
-        
+
+    def __init__(self, master, on_add_part: Callable, on_add_parts: Callable = None):
+        super().__init__(master, ["Capa", "Nombre", "Tamaño", "Opacidad", "Función", "Agregar"])
+
         self.on_add_part = on_add_part
-        
+        self.on_add_parts = on_add_parts
+
         # Barra superior
         self._controls_frame = ctk.CTkFrame(self, fg_color="transparent")
         self._controls_frame.grid(row=0, column=0, columnspan=6, padx=(6, 4), pady=(4, 0), sticky="we")
-        
+
         # Contador de partes
         self._parts_count_label = ctk.CTkLabel(self._controls_frame, text="Partes: -", font=("Segoe UI", 12))
         self._parts_count_label.pack(side="left", padx=(0, 8))
-        
+
+        # Botón Agregar Seleccionadas
+        self._add_selected_btn = ctk.CTkButton(
+            self._controls_frame, text="Agregar Seleccionadas", width=150, height=24,
+            font=("Segoe UI", 12), command=self._on_add_selected
+        )
+        self._add_selected_btn.pack(side="left", padx=(0, 8))
+
         # Botón Cerrar PMDL Secundario
         self._close_btn = ctk.CTkButton(
             self._controls_frame, text="Cerrar PMDL", width=100, height=24,
@@ -326,13 +627,7 @@ class SecondaryPartsTable(ctk.CTkScrollableFrame):
             command=self._on_close_pmdl_secondary
         )
         self._close_btn.pack(side="left", padx=(0, 0))
-        
-        # Encabezados (fila 1)
-        headers = ["Capa", "Nombre", "Tamaño", "Opacidad", "Función", "Agregar"]
-        for col, text in enumerate(headers):
-            lbl = ctk.CTkLabel(self, text=text, font=("Segoe UI", 12))
-            lbl.grid(row=1, column=col, padx=(6, 4), pady=(4, 4), sticky="w")
-        
+
         # Columnas
         self.grid_columnconfigure(0, weight=0)  # Capa
         self.grid_columnconfigure(1, weight=1)  # Nombre
@@ -340,87 +635,86 @@ class SecondaryPartsTable(ctk.CTkScrollableFrame):
         self.grid_columnconfigure(3, weight=0)  # Opacidad
         self.grid_columnconfigure(4, weight=0)  # Función
         self.grid_columnconfigure(5, weight=0)  # Agregar
-        
-        self._rows_widgets = []
-        self._row_backgrounds = []
-    
+
     def update_part_count(self, part_count: int):
         """Actualiza el contador de partes."""
         self._parts_count_label.configure(text=f"Partes: {part_count}")
-    
-    def clear(self):
-        """Limpia todas las filas de la tabla."""
-        for ws in self._rows_widgets:
-            for w in ws:
-                try:
-                    w.destroy()
-                except Exception:
-                    pass
-        self._rows_widgets.clear()
-        
-        # Limpiar backgrounds de zebra striping
-        for bg in self._row_backgrounds:
-            try:
-                bg.destroy()
-            except Exception:
-                pass
-        self._row_backgrounds.clear()
-    
-    def populate(self, parts: List[PartIndexEntry]):
-        """Puebla la tabla con las partes del PMDL secundario."""
-        self.clear()
-        
-        for i, p in enumerate(parts):
-            row = i + 2
-            
-            # Zebra striping
-            is_even = i % 2 == 0
-            bg_color = ("gray85", "gray20") if is_even else ("gray90", "gray17")
-            
-            # Frame de fondo para la fila
-            row_bg = ctk.CTkFrame(self, fg_color=bg_color, corner_radius=0, height=28)
-            row_bg.grid(row=row, column=0, columnspan=6, sticky="ew", padx=0, pady=0)
-            self._row_backgrounds.append(row_bg)
-            
-            # Capa
-            capa_lbl = ctk.CTkLabel(self, text=f"{p.part_id & 0xFF:02X}",
-                                    font=("Segoe UI", 12), width=40, fg_color=bg_color)
-            capa_lbl.grid(row=row, column=0, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Nombre
-            name_lbl = ctk.CTkLabel(self, text=f"Parte_{i}", font=("Segoe UI", 12), fg_color=bg_color)
-            name_lbl.grid(row=row, column=1, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Tamaño
-            size_lbl = ctk.CTkLabel(self, text=f"{p.part_length:X}", font=("Segoe UI", 12), fg_color=bg_color)
-            size_lbl.grid(row=row, column=2, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Opacidad
-            if p.opacity <= 0:
-                pct = 0
-            elif p.opacity >= 0xFFFF:
-                pct = 100
-            else:
-                pct = round(p.opacity * 100 / 0xFFFF)
-            pct_lbl = ctk.CTkLabel(self, text=f"{pct}%", font=("Segoe UI", 12), fg_color=bg_color)
-            pct_lbl.grid(row=row, column=3, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Función
-            func_lbl = ctk.CTkLabel(self, text=FLAG_MAP_VALUE_TO_LABEL.get(p.special_flag, "Ninguna"),
-                                    font=("Segoe UI", 12), fg_color=bg_color)
-            func_lbl.grid(row=row, column=4, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            # Botón Agregar
-            add_btn = ctk.CTkButton(self, text="Agregar", width=76, font=("Segoe UI", 12),
-                                    command=lambda idx=i: self.on_add_part(idx))
-            add_btn.grid(row=row, column=5, padx=(6, 4), pady=(2, 2), sticky="w")
-            
-            self._rows_widgets.append([capa_lbl, name_lbl, size_lbl, pct_lbl, func_lbl, add_btn])
-    
+
+    # ----- Filas -----
+
+    def _create_slot(self, row: int) -> _RowSlot:
+        slot = _RowSlot(row)
+        bg_color = _row_color(0)
+
+        # Frame de fondo para la fila
+        slot.row_bg = self._create_row_background(slot)
+
+        slot.capa_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), width=40, fg_color=bg_color)
+        slot.name_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+        slot.size_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+        slot.pct_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+        slot.func_lbl = ctk.CTkLabel(self, text="", font=("Segoe UI", 12), fg_color=bg_color)
+
+        # Acción: Seleccionar + Agregar
+        action_frame = ctk.CTkFrame(self, fg_color="transparent")
+
+        slot.selected_var = tk.BooleanVar(value=False)
+        select_chk = ctk.CTkCheckBox(action_frame, text="", width=24, checkbox_width=18,
+                                     checkbox_height=18, variable=slot.selected_var,
+                                     command=lambda s=slot: self._on_select(s))
+        select_chk.pack(side="left", padx=(0, 4))
+
+        add_btn = ctk.CTkButton(action_frame, text="Agregar", width=76, font=("Segoe UI", 12),
+                                command=lambda s=slot: self._on_add(s.index))
+        add_btn.pack(side="left", padx=(0, 0))
+
+        self._grid_row_widgets(slot, [
+            (slot.capa_lbl, 0, (6, 4)),
+            (slot.name_lbl, 1, (6, 4)),
+            (slot.size_lbl, 2, (6, 4)),
+            (slot.pct_lbl, 3, (6, 4)),
+            (slot.func_lbl, 4, (6, 4)),
+            (action_frame, 5, (6, 4)),
+        ])
+        return slot
+
+    def _bind_slot(self, slot: _RowSlot, index: int):
+        p = self._parts[index]
+
+        # Zebra striping
+        bg_color = _row_color(index)
+        if slot.index < 0 or (slot.index - index) % 2:
+            for w in (slot.row_bg, slot.capa_lbl, slot.name_lbl, slot.size_lbl, slot.pct_lbl, slot.func_lbl):
+                w.configure(fg_color=bg_color)
+
+        slot.capa_lbl.configure(text=f"{p.part_id & 0xFF:02X}")
+        slot.name_lbl.configure(text=f"Parte_{index}")
+        slot.size_lbl.configure(text=f"{p.part_length:X}")
+        slot.pct_lbl.configure(text=f"{percent_from_opacity_u16(p.opacity)}%")
+        slot.func_lbl.configure(text=FLAG_MAP_VALUE_TO_LABEL.get(p.special_flag, "Ninguna"))
+        slot.selected_var.set(self._selected[index])
+
+    # ----- Callbacks -----
+
+    def _on_select(self, slot: _RowSlot):
+        """Guarda la marca de selección de la parte de la fila."""
+        if slot.index >= 0:
+            self._selected[slot.index] = bool(slot.selected_var.get())
+
+    def _on_add(self, part_index: int):
+        """Callback para agregar una parte."""
+        if part_index >= 0:
+            self.on_add_part(part_index)
+
+    def _on_add_selected(self):
+        """Callback para agregar las partes seleccionadas."""
+        if callable(self.on_add_parts):
+            self.on_add_parts(self.get_selected_indices())
+
     def _on_close_pmdl_secondary(self):
         """Callback para cerrar el PMDL secundario."""
-        from tkinter import messagebox
-        if messagebox.askyesno("Cerrar PMDL Secundario", "¿Estás seguro de que deseas cerrar el PMDL secundario?"):
-            # Llamar al método del controlador para limpiar todo
-            if hasattr(self.master, 'master') and hasattr(self.master.master, 'on_close_pmdl_secondary'):
-                self.master.master.on_close_pmdl_secondary()
\ No newline at end of file
+        self._on_close_requested(
+            "Cerrar PMDL Secundario",
+            "¿Estás seguro de que deseas cerrar el PMDL secundario?",
+            'on_close_pmdl_secondary'
+        )
@@ -1,3 +1,4 @@
 from .window import center_window
+from .jobs import Job, JobCancelled, JobExecutor
 
-__all__ = ['center_window']
\ No newline at end of file
+__all__ = ['center_window', 'Job', 'JobCancelled', 'JobExecutor']
@@ -0,0 +1,193 @@
+"""
+Ejecución de operaciones largas en un hilo de trabajo.
+
+El hilo de Tk nunca espera: la operación corre en segundo plano y sus
+mensajes (progreso, resultado, error y llamadas a la UI) pasan por una cola
+que el hilo de Tk revisa con `after()`.
+"""
+import queue
+import threading
+from contextlib import ExitStack
+from typing import Any, Callable, Optional, Sequence
+
+
+POLL_MS = 50    # Intervalo de revisión de la cola
+
+
+class JobCancelled(Exception):
+    """La operación se canceló antes de terminar."""
+
+
+class Job:
+    """
+    Operación en curso.
+
+    La función de trabajo recibe el `Job` y llama a `report()` o `check()` en
+    los puntos donde puede detenerse sin dejar el documento a medias.
+    """
+
+    def __init__(self, label: str, messages: queue.Queue):
+        self.label = label
+        self._messages = messages
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Pide detener la operación en el próximo punto de control."""
+        self._cancel.set()
+
+    def check(self):
+        """Lanza `JobCancelled` si se pidió cancelar."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.label)
+
+    def report(self, done: int, total: int):
+        """Informa el avance (`done` de `total`); también es punto de control."""
+        self.check()
+        self._messages.put(("progress", self, (done, total)))
+
+
+class JobExecutor:
+    """
+    Ejecuta una operación a la vez en un hilo de trabajo.
+
+    Los callbacks (`on_done`, `on_error`, `on_cancel`, `on_progress`) y las
+    funciones envueltas con `in_ui()` se llaman siempre en el hilo de Tk.
+    Mientras la operación corre se mantienen tomados los `locks` recibidos,
+    normalmente los de los documentos que modifica.
+    """
+
+    def __init__(self, widget, poll_ms: int = POLL_MS):
+        self._widget = widget
+        self._poll_ms = poll_ms
+        self._messages: queue.Queue = queue.Queue()
+        self._ui_thread = threading.current_thread()
+        self._job: Optional[Job] = None
+        self._callbacks = (None, None, None, None)
+        self._after_id = None
+
+    @property
+    def busy(self) -> bool:
+        """Indica si hay una operación en curso."""
+        return self._job is not None
+
+    @property
+    def current(self) -> Optional[Job]:
+        return self._job
+
+    def submit(self, label: str, work: Callable[[Job], Any],
+               on_done: Callable[[Any], None] = None,
+               on_error: Callable[[Exception], None] = None,
+               on_cancel: Callable[[], None] = None,
+               on_progress: Callable[[Job, int, int], None] = None,
+               locks: Sequence = ()) -> Job:
+        """
+        Inicia `work(job)` en un hilo de trabajo.
+
+        Raises:
+            ValueError: Si ya hay una operación en curso.
+        """
+        if self._job is not None:
+            raise ValueError("Ya hay una operación en curso.")
+
+        job = Job(label, self._messages)
+        self._job = job
+        self._callbacks = (on_done, on_error, on_cancel, on_progress)
+
+        thread = threading.Thread(target=self._run, args=(job, work, locks), daemon=True)
+        thread.start()
+        self._schedule()
+        return job
+
+    def cancel(self) -> bool:
+        """Pide cancelar la operación en curso; devuelve False si no hay ninguna."""
+        if self._job is None:
+            return False
+        self._job.cancel()
+        return True
+
+    def in_ui(self, fn: Callable) -> Callable:
+        """
+        Envuelve `fn` para que siempre corra en el hilo de Tk.
+
+        Desde el hilo de Tk se llama al momento; desde el hilo de trabajo se
+        encola y se llama en la próxima revisión, en el mismo orden.
+        """
+        def wrapper(*args):
+            if threading.current_thread() is self._ui_thread:
+                fn(*args)
+            else:
+                self._messages.put(("call", fn, args))
+        return wrapper
+
+    # ----- Hilo de trabajo -----
+
+    def _run(self, job: Job, work: Callable[[Job], Any], locks: Sequence):
+        try:
+            with ExitStack() as stack:
+                for lock in locks:
+                    stack.enter_context(lock)
+                job.check()
+                result = work(job)
+        except JobCancelled:
+            self._messages.put(("cancelled", job, None))
+        except Exception as e:
+            self._messages.put(("error", job, e))
+        else:
+            self._messages.put(("done", job, result))
+
+    # ----- Hilo de Tk -----
+
+    def _schedule(self):
+        if self._after_id is None:
+            self._after_id = self._widget.after(self._poll_ms, self._poll)
+
+    def _poll(self):
+        """Atiende los mensajes encolados; del progreso solo se muestra el último."""
+        self._after_id = None
+        progress = None
+
+        while True:
+            try:
+                kind, target, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                progress = (target, payload)
+                continue
+            if progress is not None:
+                self._show_progress(*progress)
+                progress = None
+
+            if kind == "call":
+                target(*payload)
+            else:
+                self._finish(kind, target, payload)
+
+        if progress is not None:
+            self._show_progress(*progress)
+        if self._job is not None:
+            self._schedule()
+
+    def _show_progress(self, job: Job, payload):
+        on_progress = self._callbacks[3]
+        if on_progress is not None and job is self._job:
+            on_progress(job, *payload)
+
+    def _finish(self, kind: str, job: Job, payload):
+        if job is not self._job:
+            return
+        on_done, on_error, on_cancel, _ = self._callbacks
+        self._job = None
+        self._callbacks = (None, None, None, None)
+
+        if kind == "done" and on_done is not None:
+            on_done(payload)
+        elif kind == "error" and on_error is not None:
+            on_error(payload)
+        elif kind == "cancelled" and on_cancel is not None:
+            on_cancel()
@@ -0,0 +1,138 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from app.core import PmdlDocument, PARTS_UPDATED, apply_part_edits, delete_part, export_part
+
+
+INDEX_OFFSET = 0x70
+
+
+def make_pmdl(payloads, residue=b"") -> bytes:
+    """PMDL mínimo: cabecera, índice contiguo y partes en orden (ID = primer byte)."""
+    blob = bytearray(INDEX_OFFSET + 0x20 * len(payloads))
+    blob[0:4] = b"pMdl"
+    struct.pack_into("<I", blob, 0x5C, len(payloads))
+    struct.pack_into("<I", blob, 0x60, INDEX_OFFSET)
+
+    offset = len(blob)
+    for i, data in enumerate(payloads):
+        struct.pack_into("<HHII", blob, INDEX_OFFSET + 0x20 * i, data[0], 0xFFFF, offset, len(data))
+        offset += len(data)
+    return bytes(blob) + b"".join(payloads) + residue
+
+
+class SaveTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "a.pmdl")
+        self.payloads = [bytes([i]) * (16 * (i + 1)) for i in range(4)]
+        with open(self.path, "wb") as f:
+            f.write(make_pmdl(self.payloads, residue=b"RESIDUO"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_with_live_view(self):
+        doc = PmdlDocument(self.path)
+        view = doc.part_data(1)
+        delete_part(doc, 0)
+
+        doc.save()
+
+        self.assertEqual(bytes(view), self.payloads[1])
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), make_pmdl(self.payloads[1:]))
+        self.assertEqual(bytes(doc.part_data(0)), self.payloads[1])
+        doc.close()
+
+    def test_close_with_live_view(self):
+        doc = PmdlDocument(self.path)
+        view = doc.part_data(2)
+        doc.close()
+        self.assertEqual(bytes(view), self.payloads[2])
+
+    def test_cancelled_save_keeps_layout(self):
+        doc = PmdlDocument(self.path)
+        offsets = doc.parts.offsets.copy()
+        delete_part(doc, 0)
+
+        def cancel(done, total):
+            raise RuntimeError("cancelado")
+
+        with mock.patch("app.core.document.SAVE_CHUNK_SIZE", 16):
+            with self.assertRaises(RuntimeError):
+                doc.save(progress=cancel)
+        self.assertEqual(doc.parts.offsets.tolist(), offsets[1:].tolist())
+        doc.close()
+
+    def test_failed_replace_keeps_layout(self):
+        doc = PmdlDocument(self.path)
+        offsets = doc.parts.offsets.copy()
+        delete_part(doc, 0)
+
+        with mock.patch("os.replace", side_effect=OSError("ocupado")):
+            with self.assertRaises(OSError):
+                doc.save()
+        self.assertEqual(doc.parts.offsets.tolist(), offsets[1:].tolist())
+        self.assertEqual([bytes(doc.part_data(i)) for i in range(3)], self.payloads[1:])
+        self.assertEqual(os.listdir(self.dir.name), ["a.pmdl"])
+
+        doc.save()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), make_pmdl(self.payloads[1:]))
+        doc.close()
+
+    def test_export_part_view_is_scoped(self):
+        doc = PmdlDocument(self.path)
+        with export_part(doc, 3) as chunk:
+            self.assertEqual(bytes(chunk), self.payloads[3])
+        with self.assertRaises(ValueError):
+            bytes(chunk)
+        doc.close()
+
+
+class EditHistoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.dir.name, "a.pmdl")
+        with open(path, "wb") as f:
+            f.write(make_pmdl([bytes([i]) * 16 for i in range(4)]))
+        self.doc = PmdlDocument(path)
+
+    def tearDown(self):
+        self.doc.close()
+        self.dir.cleanup()
+
+    def test_undo_reverts_the_edit_not_the_previous_step(self):
+        delete_part(self.doc, 0)
+        opacity = self.doc.parts[1].opacity
+        apply_part_edits(self.doc, {1: {'opacity_pct': 50}})
+
+        self.assertEqual(self.doc.undo(), "Editar partes")
+        self.assertEqual(self.doc.parts[1].opacity, opacity)
+        self.assertEqual(len(self.doc.parts), 3)
+
+        self.doc.redo()
+        self.assertNotEqual(self.doc.parts[1].opacity, opacity)
+
+    def test_slider_drag_is_one_step(self):
+        part_id = self.doc.parts[2].part_id
+        for depth in (1, 2, 3):
+            apply_part_edits(self.doc, {2: {'depth': depth}})
+        self.assertEqual(self.doc.parts[2].part_id & 0xFF, 3)
+
+        events = []
+        self.doc.add_listener(events.append)
+        self.doc.undo()
+        self.assertEqual(self.doc.parts[2].part_id, part_id)
+        self.assertFalse(self.doc.journal.can_undo)
+        self.assertEqual([(e.kind, e.indices) for e in events], [(PARTS_UPDATED, (2,))])
+
+
+if __name__ == "__main__":
+    unittest.main()